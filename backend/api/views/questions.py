@@ -66,7 +66,7 @@ class PlannedPollsListView(generics.ListAPIView):
         """
 
         queryset = (
-            PollStatus.objects.all().order_by(
+            PollStatus.objects.filter(is_visible=True).order_by(
                 Case(
                     When(completed_at__isnull=True, then=Value(1)),
                     When(completed_at__isnull=False, then=Value(0)),
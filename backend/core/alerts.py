@@ -0,0 +1,102 @@
+import re
+from typing import List
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+ADMIN_ALERTS_KEY = "ADMIN_ALERTS"
+# Флаг того, что отправка дайджеста уже запланирована
+ADMIN_ALERTS_SCHEDULED_KEY = "ADMIN_ALERTS_SCHEDULED"
+TELEGRAM_MESSAGE_LIMIT = 4096
+ADMIN_ALERTS_SEPARATOR = "\n\n———\n\n"
+# Чем заканчивается обрезанное уведомление
+ADMIN_ALERT_TRUNCATED_SUFFIX = "…"
+ADMIN_ALERT_TAG_RE = re.compile(r"<(/?)(\w+)[^>]*>")
+
+
+def enqueue_admin_alert(message: str) -> int | None:
+    """
+    Кладет уведомление админам в очередь Redis.
+
+    Returns:
+        int | None: Через сколько секунд нужно запустить отправку дайджеста
+            или None, если отправка уже запланирована.
+            Первое уведомление в окне планирует отправку через ADMIN_ALERTS_WINDOW секунд,
+            поэтому ни одно уведомление не ждет дольше окна.
+            При накоплении ADMIN_ALERTS_MAX_BATCH уведомлений дайджест уходит сразу
+    """
+    redis = get_redis_connection("default")
+    length = redis.rpush(ADMIN_ALERTS_KEY, message)
+    if length == settings.ADMIN_ALERTS_MAX_BATCH:
+        return 0
+    # запас по времени жизни флага на случай, если запланированная задача потеряется
+    if redis.set(ADMIN_ALERTS_SCHEDULED_KEY, 1, nx=True, ex=settings.ADMIN_ALERTS_WINDOW * 2):
+        return settings.ADMIN_ALERTS_WINDOW
+    return None
+
+
+def pop_admin_alerts() -> List[str]:
+    """
+    Атомарно забирает из очереди все накопленные уведомления
+    """
+    redis = get_redis_connection("default")
+    # флаг снимается до чтения очереди: уведомление, пришедшее после чтения, запланирует новую отправку
+    redis.delete(ADMIN_ALERTS_SCHEDULED_KEY)
+    pipeline = redis.pipeline(transaction=True)
+    pipeline.lrange(ADMIN_ALERTS_KEY, 0, -1)
+    pipeline.delete(ADMIN_ALERTS_KEY)
+    messages, _ = pipeline.execute()
+    return [message.decode() for message in messages]
+
+
+def truncate_admin_alert(message: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> str:
+    """
+    Обрезает уведомление до limit символов, не разрывая HTML-теги и сущности:
+    недописанный тег отбрасывается, открытые теги закрываются
+    """
+    if len(message) <= limit:
+        return message
+    cut = limit - len(ADMIN_ALERT_TRUNCATED_SUFFIX)
+    while True:
+        text = message[:cut]
+        if text.rfind("<") > text.rfind(">"):
+            text = text[:text.rfind("<")]
+        if text.rfind("&") > text.rfind(";"):
+            text = text[:text.rfind("&")]
+        open_tags = []
+        for closing, tag in ADMIN_ALERT_TAG_RE.findall(text):
+            if not closing:
+                open_tags.append(tag)
+            elif open_tags and open_tags[-1] == tag:
+                open_tags.pop()
+        text += ADMIN_ALERT_TRUNCATED_SUFFIX + "".join(f"</{tag}>" for tag in reversed(open_tags))
+        if len(text) <= limit:
+            return text
+        cut -= len(text) - limit
+
+
+def build_admin_digests(messages: List[str]) -> List[str]:
+    """
+    Собирает уведомления в дайджесты, не превышающие лимит длины сообщения Telegram.
+    Уведомления не разрываются между дайджестами, поэтому HTML-разметка каждого остается целой,
+    слишком длинное уведомление обрезается так, чтобы поместиться в дайджест вместе с заголовком
+    """
+    if len(messages) <= 1:
+        return [truncate_admin_alert(message) for message in messages]
+
+    header = f"<strong>Ответы, требующие внимания ({len(messages)}):</strong>"
+    alert_limit = TELEGRAM_MESSAGE_LIMIT - len(header) - len(ADMIN_ALERTS_SEPARATOR)
+    digests = []
+    current = header
+    current_alerts = 0
+    for message in messages:
+        message = truncate_admin_alert(message, alert_limit)
+        if current_alerts and len(current) + len(ADMIN_ALERTS_SEPARATOR) + len(message) > TELEGRAM_MESSAGE_LIMIT:
+            digests.append(current)
+            current = message
+            current_alerts = 1
+        else:
+            current += ADMIN_ALERTS_SEPARATOR + message
+            current_alerts += 1
+    digests.append(current)
+    return digests
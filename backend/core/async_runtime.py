@@ -0,0 +1,75 @@
+import asyncio
+import os
+import threading
+from typing import Any, Coroutine
+
+from core.management.bot.create_bot import bot
+
+
+class AsyncRuntime:
+    """
+    Долгоживущий цикл событий процесса в отдельном потоке.
+    Синхронный код (задачи Celery) передает в него корутины, поэтому сессия бота
+    и ее пул keep-alive соединений к Bot API переиспользуются между задачами
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="async-runtime", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coroutine: Coroutine, timeout: float | None = None) -> Any:
+        """
+        Выполняет корутину в цикле событий процесса и ждет результат
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def stop(self):
+        """
+        Закрывает сессию бота в ее цикле событий и останавливает цикл
+        """
+        if bot:
+            self.run(bot.session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+_runtime: AsyncRuntime | None = None
+_runtime_lock = threading.Lock()
+
+
+def start_async_runtime(**kwargs) -> AsyncRuntime:
+    """
+    Запускает цикл событий процесса (обработчик сигнала worker_process_init).
+    После fork поток родителя в дочернем процессе не существует, поэтому цикл создается заново
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None or _runtime.pid != os.getpid():
+            _runtime = AsyncRuntime()
+        return _runtime
+
+
+def stop_async_runtime(**kwargs):
+    """
+    Останавливает цикл событий процесса (обработчик сигнала worker_process_shutdown)
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is not None and _runtime.pid == os.getpid():
+            _runtime.stop()
+        _runtime = None
+
+
+def run_async(coroutine: Coroutine) -> Any:
+    """
+    Выполняет корутину в цикле событий процесса. Если цикл еще не запущен (пул solo/threads, вызов вне Celery),
+    запускает его
+    """
+    return start_async_runtime().run(coroutine)
@@ -0,0 +1,199 @@
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Iterable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup, ReplyKeyboardRemove
+
+from core.management.bot.create_bot import bot
+
+# Общий лимит отправки сообщений ботом (сообщений в секунду)
+BROADCAST_RATE = 30
+# Минимальный интервал (в секундах) между сообщениями в один чат
+BROADCAST_CHAT_INTERVAL = 1
+# Количество одновременно обслуживаемых чатов
+BROADCAST_CONCURRENCY = 30
+# Сколько раз сообщение переотправляется после ответа 429 (RetryAfter)
+BROADCAST_MAX_RETRIES = 3
+
+
+class BroadcastMessage:
+    """
+    Сообщение рассылки
+    """
+
+    __slots__ = ("chat_id", "text", "reply_markup", "attempts")
+
+    def __init__(
+            self,
+            chat_id: int,
+            text: str,
+            reply_markup: InlineKeyboardMarkup | ReplyKeyboardRemove | None = None,
+    ):
+        self.chat_id = chat_id
+        self.text = text
+        self.reply_markup = reply_markup
+        self.attempts = 0
+
+
+class BroadcastResult:
+    """
+    Итоги рассылки.
+
+    Attributes:
+        sent (int): Количество отправленных сообщений.
+        failed (int): Количество неотправленных сообщений.
+        retried (int): Количество повторных отправок после RetryAfter.
+        elapsed (float): Длительность рассылки в секундах.
+    """
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.elapsed = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "elapsed": round(self.elapsed, 3),
+        }
+
+    def __repr__(self):
+        return f"<BroadcastResult {self.to_dict()}>"
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты "ведро с токенами" для всех отправок рассылки
+    """
+
+    def __init__(self, rate: float, capacity: int | None = None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """
+        Приостанавливает выдачу токенов (Telegram ответил 429 и просит подождать)
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class Broadcaster:
+    """
+    Конкурентная рассылка сообщений с общим лимитом частоты и лимитом на чат.
+    Сообщения одного чата уходят по порядку, после RetryAfter чат возвращается в конец очереди
+    """
+
+    def __init__(
+            self,
+            bot: Bot,
+            rate: float = BROADCAST_RATE,
+            chat_interval: float = BROADCAST_CHAT_INTERVAL,
+            concurrency: int = BROADCAST_CONCURRENCY,
+            max_retries: int = BROADCAST_MAX_RETRIES,
+    ):
+        self.bot = bot
+        self.bucket = TokenBucket(rate)
+        self.chat_interval = chat_interval
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._last_sent_at: Dict[int, float] = {}
+
+    async def send(self, messages: Iterable[BroadcastMessage]) -> BroadcastResult:
+        result = BroadcastResult()
+        started = time.perf_counter()
+
+        chats: Dict[int, deque] = {}
+        for message in messages:
+            if message.chat_id:
+                chats.setdefault(message.chat_id, deque()).append(message)
+
+        queue = asyncio.Queue()
+        for chat_id, chat_messages in chats.items():
+            queue.put_nowait((chat_id, chat_messages))
+
+        workers = [
+            asyncio.create_task(self._worker(queue, result))
+            for _ in range(min(self.concurrency, len(chats)))
+        ]
+        await queue.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    async def _wait_chat(self, chat_id: int):
+        last_sent_at = self._last_sent_at.get(chat_id)
+        if last_sent_at is not None:
+            delay = self.chat_interval - (time.monotonic() - last_sent_at)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def _worker(self, queue: asyncio.Queue, result: BroadcastResult):
+        while True:
+            chat_id, chat_messages = await queue.get()
+            try:
+                while chat_messages:
+                    message = chat_messages[0]
+                    await self._wait_chat(chat_id)
+                    await self.bucket.acquire()
+                    try:
+                        await self.bot.send_message(
+                            chat_id=chat_id,
+                            text=message.text,
+                            reply_markup=message.reply_markup,
+                        )
+                    except TelegramRetryAfter as error:
+                        self.bucket.pause(error.retry_after)
+                        message.attempts += 1
+                        if message.attempts > self.max_retries:
+                            result.failed += 1
+                            chat_messages.popleft()
+                            continue
+                        result.retried += 1
+                        queue.put_nowait((chat_id, chat_messages))
+                        break
+                    except Exception:
+                        # пользователь заблокировал бота, чат не найден и т.п. - повтор не поможет
+                        result.failed += 1
+                        chat_messages.popleft()
+                    else:
+                        result.sent += 1
+                        chat_messages.popleft()
+                    finally:
+                        self._last_sent_at[chat_id] = time.monotonic()
+            finally:
+                queue.task_done()
+
+
+async def broadcast(messages: Iterable[BroadcastMessage]) -> BroadcastResult:
+    """
+    Рассылает сообщения ботом с соблюдением лимитов Telegram
+    """
+    return await Broadcaster(bot).send(messages)
@@ -30,9 +30,23 @@ class QuestionAnswerCF(CallbackData, prefix='question_answer', sep='^'):
     slot_time: Union[str, None] = None
 
 
-class ListPollsCF(CallbackData, prefix="list_polls_id"):
+class ListPollsCF(CallbackData, prefix="list_polls"):
     """
-    Фабрика колбэков для генерации списка в зависимости от типа опросов
+    Фабрика колбэков для генерации списка в зависимости от типа опросов.
+    Курсор (poll_number, poll_status_id) - крайний опрос соседней страницы,
+    backward - листание назад
+    """
+    polls_type: str = None
+    time_of_day: str = None
+    poll_number: Optional[int] = None
+    poll_status_id: Optional[int] = None
+    backward: Optional[bool] = False
+
+
+class LegacyListPollsCF(CallbackData, prefix="list_polls_id"):
+    """
+    Фабрика колбэков списка опросов в старом формате (с номером страницы).
+    Нужна, чтобы работали кнопки в уже отправленных уведомлениях
     """
     polls_type: str = None
     page: Optional[int] = 1
@@ -3,3 +3,17 @@ import os
 
 load_dotenv()
 BOT_TOKEN = os.getenv('BOT_TOKEN')
+# Redis для хранения состояний FSM. Если не задан - используется REDIS_URL, без него - память процесса
+FSM_REDIS_URL = os.getenv('FSM_REDIS_URL', os.getenv('REDIS_URL'))
+# Время жизни (в секундах) состояния и данных FSM в Redis
+FSM_STATE_TTL = int(os.getenv('FSM_STATE_TTL', 60 * 60 * 24))
+# Адрес Bot API. Позволяет направить бота на локальную имитацию (команда fake_bot_api)
+BOT_API_URL = os.getenv('BOT_API_URL')
+# Настройки режима вебхука
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/bot/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8080))
+# Порог (в секундах), после которого обработка апдейта логируется как медленная
+BOT_SLOW_UPDATE_THRESHOLD = float(os.getenv('BOT_SLOW_UPDATE_THRESHOLD', 1))
@@ -1,15 +1,38 @@
+import json
+from functools import partial
 from typing import Tuple, Optional
 
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisStorage
 from aiogram.types import BotCommand
 
-from core.management.bot.config import BOT_TOKEN
+from core.management.bot.config import BOT_TOKEN, BOT_API_URL, FSM_REDIS_URL, FSM_STATE_TTL
+
+
+def initial_storage(redis_url: str | None) -> BaseStorage:
+    """
+    Создает хранилище состояний FSM.
+    Состояния хранятся в Redis, чтобы переживать рестарт бота и быть общими для нескольких процессов
+    """
+    if not redis_url:
+        return MemoryStorage()
+    return RedisStorage.from_url(
+        redis_url,
+        state_ttl=FSM_STATE_TTL,
+        data_ttl=FSM_STATE_TTL,
+        json_dumps=partial(json.dumps, separators=(',', ':')),
+    )
 
 
 def initial_bot(token: str | None) -> Tuple[Optional[Bot], Optional[Dispatcher]]:
     """Инициализирует бота если найден токен в энвах"""
     if token:
-        return Bot(token), Dispatcher()
+        session = AiohttpSession(api=TelegramAPIServer.from_base(BOT_API_URL)) if BOT_API_URL else None
+        return Bot(token, session=session), Dispatcher(storage=initial_storage(FSM_REDIS_URL))
     return None, None
 
 
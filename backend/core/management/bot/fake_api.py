@@ -0,0 +1,101 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Dict
+
+from aiohttp import web
+
+
+class FakeBotAPI:
+    """
+    Имитация Telegram Bot API для нагрузочного тестирования бота без сети.
+    Отвечает на любой метод успешным результатом правдоподобной формы.
+    Запоминает последнее отправленное в каждый чат сообщение, чтобы нагрузочный тест мог нажимать его кнопки
+    """
+
+    # Методы, отправляющие новое сообщение в чат
+    SEND_METHODS = ("sendMessage", "sendDocument")
+
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self.calls = defaultdict(int)
+        self.last_messages: Dict[int, dict] = {}
+
+    def make_message(self, data) -> dict:
+        chat_id = int(data.get("chat_id") or 0)
+        message = {
+            "message_id": int(data.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": data.get("text") or "",
+        }
+        if "document" in data:
+            file_number = next(self._file_ids)
+            message["document"] = {"file_id": f"fake-file-{file_number}", "file_unique_id": f"fake-{file_number}"}
+        return message
+
+    @staticmethod
+    def make_user(token: str) -> dict:
+        return {"id": int(token.split(":")[0]), "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+
+    def record_message(self, message: dict, data):
+        """
+        Запоминает отправленное сообщение вместе с разобранной клавиатурой
+        """
+        reply_markup = data.get("reply_markup")
+        self.last_messages[message["chat"]["id"]] = {
+            "message_id": message["message_id"],
+            "text": message["text"],
+            "reply_markup": json.loads(reply_markup) if reply_markup else None,
+        }
+
+    def last_message(self, chat_id: int) -> dict | None:
+        return self.last_messages.get(chat_id)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        data = await request.post()
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getMe":
+            result = self.make_user(request.match_info["token"])
+        elif method in self.SEND_METHODS or (method == "editMessageText" and "chat_id" in data):
+            result = self.make_message(data)
+            if method in self.SEND_METHODS:
+                self.record_message(result, data)
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+    def start_in_thread(self, host: str, port: int) -> threading.Thread:
+        """
+        Запускает сервер в фоновом потоке со своим циклом событий,
+        чтобы к нему могли обращаться и асинхронный бот, и синхронные задачи Celery
+        """
+        started = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            runner = web.AppRunner(self.create_app())
+            loop.run_until_complete(runner.setup())
+            loop.run_until_complete(web.TCPSite(runner, host, port).start())
+            started.set()
+            loop.run_forever()
+
+        thread = threading.Thread(target=run, name="fake-bot-api", daemon=True)
+        thread.start()
+        started.wait()
+        return thread
@@ -7,16 +7,30 @@ from core.management.bot.keyboards import generate_answers_keyboard, main_keyboa
 from core.management.bot.states import ProcessInterview, ProcessRegistration
 from core.management.bot.texts import texts_reg_need_code
 from core.management.bot.utils.functions import get_question_to_poll_id, \
-    get_question_for_id, get_next_question_id, save_user_answer, get_poll_status, completed_poll_status, \
+    get_question_for_id, get_next_question_id, get_poll_status, completed_poll_status, \
     get_last_question_and_answer, booked_slot, get_employee, update_telegram_nickname, check_completion_previous_poll, \
-    prepared_answer, send_notification_admins, get_label_content_type
-from core.management.bot.callback_factory import PollsIdCF, QuestionAnswerCF, ContinuePollsIdCF, ListPollsCF
+    prepared_answer, get_label_content_type, get_interview_context, record_user_answer
+from core.management.bot.callback_factory import PollsIdCF, QuestionAnswerCF, ContinuePollsIdCF, ListPollsCF, \
+    LegacyListPollsCF
+from core.management.bot.utils.identity import EmployeeIdentity
 from questions.models import PollStatus
 
 router = Router(name='callbacks-router')
 
 
-async def handler_question(callback: CallbackQuery, state: FSMContext, current_question, is_start=False, last_data=None, start_message_text=None):
+async def answer_something_went_wrong(callback: CallbackQuery, state: FSMContext):
+    """
+    Ответ на нажатие кнопки, которое невозможно обработать (например, сотрудник не найден)
+    """
+    await callback.answer('Что-то пошло не так', show_alert=True)
+    await state.clear()
+    try:
+        await callback.message.delete()
+    except Exception:
+        pass
+
+
+async def handler_question(callback: CallbackQuery, state: FSMContext, employee: EmployeeIdentity, current_question, is_start=False, last_data=None, start_message_text=None):
     """
     Функция обработки нового вопроса
     """
@@ -36,7 +50,7 @@ async def handler_question(callback: CallbackQuery, state: FSMContext, current_q
     if current_question.question_type == 'finish':
         data = await state.get_data()
         await completed_poll_status(poll_id=data['poll_id'],
-                                    telegram_user_id=callback.from_user.id,
+                                    employee_id=employee.id,
                                     target_employee_id=data['target_employee_id'])
         await state.clear()
         await bot.delete_message(callback.from_user.id, data['temp_message_id'])
@@ -50,9 +64,13 @@ async def start_interview_handler(callback: CallbackQuery, callback_data: PollsI
     Хендлер начала опроса
     """
     current_state = await state.get_state()
+    employee = await get_employee(callback.from_user.id)
+    if employee is None:
+        await answer_something_went_wrong(callback, state)
+        return
     poll_status = await get_poll_status(
         poll_id=callback_data.polls_id,
-        telegram_user_id=callback.from_user.id,
+        employee_id=employee.id,
         target_employee_id=callback_data.target_employee_id,
         return_object=True
     )
@@ -64,15 +82,14 @@ async def start_interview_handler(callback: CallbackQuery, callback_data: PollsI
         except Exception:
             pass
         return
-    previous_is_completed = await check_completion_previous_poll(callback.from_user.id, callback_data.polls_id, callback_data.target_employee_id)
+    previous_is_completed = await check_completion_previous_poll(employee, callback_data.polls_id, callback_data.target_employee_id)
     if current_state is None and poll_status.status != PollStatus.Status.COMPLETED and previous_is_completed:
         questions = await get_question_to_poll_id(
             poll_id=callback_data.polls_id,
-            telegram_user_id=callback.from_user.id,
+            employee_id=employee.id,
             target_employee_id=callback_data.target_employee_id)
         await state.set_state(ProcessInterview.interview)
-        await state.update_data(questions=questions,
-                                answers=[],
+        await state.update_data(answers=[],
                                 poll_id=callback_data.polls_id,
                                 target_employee_id=callback_data.target_employee_id)
         current_question = questions[0]
@@ -86,7 +103,7 @@ async def start_interview_handler(callback: CallbackQuery, callback_data: PollsI
                 start_message_text = start_message_text.format(poll_status.target_employee.full_name)
             start_message_text = await get_label_content_type(poll_status.poll, start_message_text)
 
-        await handler_question(callback, state, current_question, is_start=True, start_message_text=start_message_text)
+        await handler_question(callback, state, employee, current_question, is_start=True, start_message_text=start_message_text)
     elif poll_status.status == PollStatus.Status.COMPLETED:
         await callback.answer('Этот опрос уже пройден', show_alert=True)
     elif current_state is not None:
@@ -101,34 +118,39 @@ async def process_interview_handler(callback: CallbackQuery, callback_data: Ques
     Основной хендлер обработки кнопочных ответов
     """
     data = await state.get_data()
-    poll_status = await get_poll_status(
-        poll_id=data['poll_id'],
+    context = await get_interview_context(
         telegram_user_id=callback.from_user.id,
-        target_employee_id=data['target_employee_id']
+        poll_id=data['poll_id'],
+        target_employee_id=data['target_employee_id'],
+        question_id=callback_data.question_id
     )
-    if poll_status is None:
+    employee, poll_status, question = context.employee, context.poll_status, context.question
+    if employee is None:
+        await answer_something_went_wrong(callback, state)
+    elif poll_status is None:
         await callback.answer('Этот опрос удален', show_alert=True)
         await state.clear()
         try:
             await callback.message.delete()
         except Exception:
             pass
-    elif poll_status == PollStatus.Status.IN_PROGRESS:
+    elif poll_status == PollStatus.Status.IN_PROGRESS and question is not None:
         answer = callback_data.args
         if answer == 'slots' and callback_data.slot_id != 0:
-            booked_result = await booked_slot(callback.from_user.id, callback_data.slot_id)
+            booked_result = await booked_slot(employee.id, callback_data.slot_id)
             if not booked_result:
                 await callback.answer('Этот слот уже занят', show_alert=True)
                 return
-        questions, answers, target_employee_id = data['questions'], data['answers'], data['target_employee_id']
-        question_id = callback_data.question_id
-        answers.append((question_id, answer))
-        question = await get_question_for_id(question_id)
-        await save_user_answer(callback.from_user.id, question.id, prepared_answer(answer), target_employee_id)
-
-        await send_notification_admins(telegram_user_id=callback.from_user.id, question=question, answer=answer, target_employee_id=target_employee_id)
-        next_question_id = await get_next_question_id(question_id, answer)
-        current_question = await get_question_for_id(next_question_id)
+        answers, target_employee_id = data['answers'], data['target_employee_id']
+        answers.append(callback_data.question_id)
+        current_question = await record_user_answer(
+            employee=employee,
+            question=question,
+            answer_text=prepared_answer(answer),
+            answer=answer,
+            target_employee_id=target_employee_id,
+            answer_condition=answer
+        )
 
         await state.update_data(answers=answers)
 
@@ -139,7 +161,7 @@ async def process_interview_handler(callback: CallbackQuery, callback_data: Ques
         else:
             last_question_data = question.text
 
-        await handler_question(callback, state, current_question, last_data=last_question_data)
+        await handler_question(callback, state, employee, current_question, last_data=last_question_data)
     else:
         await callback.answer('Что-то пошло не так', show_alert=True)
         await state.clear()
@@ -173,9 +195,13 @@ async def continue_process_interview_handler(callback: CallbackQuery, callback_d
     """
     poll_id = callback_data.polls_id
     await state.clear()
+    employee = await get_employee(callback.from_user.id)
+    if employee is None:
+        await answer_something_went_wrong(callback, state)
+        return
     poll_status = await get_poll_status(
         poll_id=poll_id,
-        telegram_user_id=callback.from_user.id,
+        employee_id=employee.id,
         target_employee_id=callback_data.target_employee_id
     )
     if poll_status is None:
@@ -186,16 +212,15 @@ async def continue_process_interview_handler(callback: CallbackQuery, callback_d
         except Exception:
             pass
     elif poll_status == PollStatus.Status.IN_FROZEN:
-        data = await get_last_question_and_answer(poll_id, callback.from_user.id, callback_data.target_employee_id)
+        data = await get_last_question_and_answer(poll_id, employee.id, callback_data.target_employee_id)
         last_question, last_answer = data
         await state.set_state(ProcessInterview.interview)
-        questions = await get_question_to_poll_id(
+        await get_question_to_poll_id(
             poll_id=poll_id,
-            telegram_user_id=callback.from_user.id,
+            employee_id=employee.id,
             target_employee_id=callback_data.target_employee_id
         )
-        await state.update_data(questions=questions,
-                                answers=[],
+        await state.update_data(answers=[],
                                 poll_id=poll_id,
                                 target_employee_id=callback_data.target_employee_id)
 
@@ -204,7 +229,7 @@ async def continue_process_interview_handler(callback: CallbackQuery, callback_d
         else:
             next_question_id = await get_next_question_id(last_question.id, last_answer)
             current_question = await get_question_for_id(next_question_id)
-        await handler_question(callback, state, current_question, is_start=True)
+        await handler_question(callback, state, employee, current_question, is_start=True)
     else:
         await callback.answer('Этот опрос уже недоступен', show_alert=True)
         try:
@@ -214,16 +239,31 @@ async def continue_process_interview_handler(callback: CallbackQuery, callback_d
 
 
 @router.callback_query(ListPollsCF.filter())
-async def get_list_for_type_interview_handler(callback: CallbackQuery, state: FSMContext, callback_data: ListPollsCF):
+@router.callback_query(LegacyListPollsCF.filter())
+async def get_list_for_type_interview_handler(
+        callback: CallbackQuery, state: FSMContext, callback_data: ListPollsCF | LegacyListPollsCF
+):
     """
     Высылает пользователю его непройденные опросы по типу опросов
+    Кнопки старого формата (с номером страницы) открывают список с начала
     """
     current_state = await state.get_state()
     if current_state is None:
-        polls_type = callback_data.polls_type
-        page = callback_data.page
-        time_of_day = callback_data.time_of_day
-        list_polls_keyboard = await generate_list_polls_keyboard(callback.from_user.id, polls_type, page, time_of_day)
+        employee = await get_employee(callback.from_user.id)
+        if employee is None:
+            await answer_something_went_wrong(callback, state)
+            return
+        cursor, backward = None, False
+        if isinstance(callback_data, ListPollsCF) and callback_data.poll_status_id is not None:
+            cursor = (callback_data.poll_number, callback_data.poll_status_id)
+            backward = callback_data.backward
+        list_polls_keyboard = await generate_list_polls_keyboard(
+            employee.id,
+            poll_type=callback_data.polls_type,
+            time_of_day=callback_data.time_of_day,
+            cursor=cursor,
+            backward=backward,
+        )
         if list_polls_keyboard is None:
             await callback.message.edit_text('На данный момент все опросы пройдены')
         else:
@@ -242,12 +282,7 @@ async def answer_without_state_handler(callback: CallbackQuery, state: FSMContex
     """
     Вспомогательный хендлер-заглушка если пользователь что-то нажимает в старых сообщениях
     """
-    await callback.answer('Что-то пошло не так', show_alert=True)
-    await state.clear()
-    try:
-        await callback.message.delete()
-    except Exception:
-        pass
+    await answer_something_went_wrong(callback, state)
 
 
 
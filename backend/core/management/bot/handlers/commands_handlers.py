@@ -9,7 +9,8 @@ from core.management.bot.create_bot import bot
 from core.management.bot.keyboards import registration_keyboard, main_keyboard, generate_list_polls_keyboard
 from core.management.bot.states import ProcessHelp
 from core.management.bot.utils.functions import get_employee, update_telegram_nickname, check_verification_code, \
-    get_curator_for_employee, get_book
+    get_curator_for_employee
+from core.management.bot.utils.media import send_book
 from core.management.bot.texts import texts_start_not_registered, texts_start_is_registered, texts_for_curator, \
     texts_reg_success_code, texts_reg_success_code_employee
 from employees.models import Employee
@@ -38,17 +39,14 @@ async def cmd_start_handler(message: Message, state: FSMContext):
                 if employee.role == Employee.RoleChoices.EMPLOYEE:
                     today = datetime.today().date()
                     if employee.date_of_employment >= today:
-                        book_employee = get_book('core/management/bot/files/book_employee.pdf')
-                        book_welcome = get_book('core/management/bot/files/book_welcome.pdf', welcome=True)
                         curator = await get_curator_for_employee(employee)
                         curator_full_name = curator.full_name if curator else 'Не назначен'
-                        await bot.send_document(message.from_user.id,
-                                                caption=texts_reg_success_code_employee.format(curator_full_name),
-                                                document=book_employee, parse_mode='HTML',
-                                                reply_markup=ReplyKeyboardRemove())
-                        await bot.send_document(message.from_user.id,
-                                                caption='Ознакомься с нашим Welcome-book',
-                                                document=book_welcome)
+                        await send_book(message.from_user.id, 'core/management/bot/files/book_employee.pdf',
+                                        caption=texts_reg_success_code_employee.format(curator_full_name),
+                                        parse_mode='HTML',
+                                        reply_markup=ReplyKeyboardRemove())
+                        await send_book(message.from_user.id, 'core/management/bot/files/book_welcome.pdf', welcome=True,
+                                        caption='Ознакомься с нашим Welcome-book')
                     else:
                         await bot.send_message(message.from_user.id, text=texts_reg_success_code,
                                                parse_mode='HTML', reply_markup=ReplyKeyboardRemove())
@@ -93,7 +91,7 @@ async def check_polls_handler(message: Message, state: FSMContext):
         if not employee:
             await message.answer(texts_start_not_registered, parse_mode='HTML', reply_markup=registration_keyboard())
         else:
-            list_polls_keyboard = await generate_list_polls_keyboard(message.from_user.id)
+            list_polls_keyboard = await generate_list_polls_keyboard(employee.id)
             if list_polls_keyboard:
                 await message.answer('Ваши непройденные опросы 👇', reply_markup=list_polls_keyboard)
             else:
@@ -1,12 +1,17 @@
-from aiogram.types import KeyboardButton, ReplyKeyboardMarkup
+import time
+from typing import Dict, Optional, Tuple
+
+from aiogram.types import KeyboardButton, ReplyKeyboardMarkup, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Q
 from django.utils import timezone
 
 from core.management.bot.callback_factory import PollsIdCF, QuestionAnswerCF, ContinuePollsIdCF, ListPollsCF
 from employees.models import Employee
 from questions.models import KeyboardType, PollStatus, PollType, TimeOfDay
-from slots.models import Slot
+from slots.utils import get_free_slots
 
 
 def interview_start_keyboard(polls_id: int, target_employee: Employee | None):
@@ -31,41 +36,99 @@ def interview_continue_keyboard(polls_id: int, target_employee: Employee | None)
     return builder.adjust(1).as_markup()
 
 
+# Клавиатуры ответов строятся один раз и переиспользуются до изменения KeyboardType
+ANSWERS_KEYBOARDS_VERSION_KEY = "ANSWERS_KEYBOARDS_VERSION"
+# Как часто (в секундах) процесс бота сверяет версию клавиатур с Redis
+ANSWERS_KEYBOARDS_CHECK_INTERVAL = 5
+
+_keyboards_state = {"version": None, "checked_at": 0.0, "keyboard_types": None}
+# (question_type, question_id) -> InlineKeyboardMarkup | None
+_answers_keyboards: Dict[Tuple[str, int], Optional[InlineKeyboardMarkup]] = {}
+
+
+def invalidate_answers_keyboards():
+    """
+    Повышает версию клавиатур ответов, чтобы все процессы бота перестроили их при следующем обращении
+    """
+    cache.add(ANSWERS_KEYBOARDS_VERSION_KEY, 0, timeout=None)
+    cache.incr(ANSWERS_KEYBOARDS_VERSION_KEY)
+    _keyboards_state["keyboard_types"] = None
+    _answers_keyboards.clear()
+
+
+def get_keyboard_types() -> Dict[str, dict]:
+    """
+    Возвращает клавиатуры из БД по типу вопроса, загружая их одним запросом при изменении версии
+    """
+    now = time.monotonic()
+    if (
+            _keyboards_state["keyboard_types"] is not None
+            and now - _keyboards_state["checked_at"] < ANSWERS_KEYBOARDS_CHECK_INTERVAL
+    ):
+        return _keyboards_state["keyboard_types"]
+
+    version = cache.get(ANSWERS_KEYBOARDS_VERSION_KEY, 0)
+    if _keyboards_state["keyboard_types"] is None or _keyboards_state["version"] != version:
+        _answers_keyboards.clear()
+        _keyboards_state["keyboard_types"] = dict(
+            KeyboardType.objects.values_list("question_type", "keyboard_json")
+        )
+        _keyboards_state["version"] = version
+    _keyboards_state["checked_at"] = now
+    return _keyboards_state["keyboard_types"]
+
+
+def build_answers_keyboard(question_id, keyboard_json) -> InlineKeyboardMarkup:
+    """
+    Строит клавиатуру ответов к вопросу из keyboard_json
+    """
+    builder = InlineKeyboardBuilder()
+    for btn in keyboard_json['inline_keyboard']:
+        builder.button(text=btn['text'],
+                       callback_data=QuestionAnswerCF(question_id=question_id, args=str(btn['callback_data'])))
+    return builder.adjust(2).as_markup()
+
+
+def build_slots_keyboard(question_id) -> InlineKeyboardMarkup:
+    """
+    Строит клавиатуру из свободных на сегодня слотов (берутся из кэша Redis)
+    """
+    builder = InlineKeyboardBuilder()
+    slots = get_free_slots()
+    if slots:
+        for slot_id, start_time in slots:
+            builder.button(text=start_time,
+                           callback_data=QuestionAnswerCF(
+                               question_id=question_id,
+                               args='slots',
+                               slot_id=slot_id,
+                               slot_time=start_time))
+    else:
+        builder.button(text='Не осталось свободных слотов',
+                       callback_data=QuestionAnswerCF(question_id=question_id,
+                                                      args=f'slots',
+                                                      slot_id=0,
+                                                      slot_time='Не выбрано'))
+    return builder.adjust(4).as_markup()
+
+
 @sync_to_async
 def generate_answers_keyboard(question_id, question_type):
     """
     Генератор клавиатуры
-    Берет клавиатуру из БД или строит из доступных слотов
+    Берет клавиатуру из кэша (заполняется из БД) или строит из доступных слотов
     """
-    builder = InlineKeyboardBuilder()
     if question_type != 'slots':
-        try:
-            keyboard_data = KeyboardType.objects.get(question_type=question_type)
-            keyboard_json = keyboard_data.keyboard_json
-            for btn in keyboard_json['inline_keyboard']:
-                builder.button(text=btn['text'],
-                               callback_data=QuestionAnswerCF(question_id=question_id, args=str(btn['callback_data'])))
-            return builder.adjust(2).as_markup()
-        except KeyboardType.DoesNotExist:
-            return None
+        keyboard_types = get_keyboard_types()
+        key = (question_type, question_id)
+        if key not in _answers_keyboards:
+            keyboard_json = keyboard_types.get(question_type)
+            _answers_keyboards[key] = (
+                build_answers_keyboard(question_id, keyboard_json) if keyboard_json is not None else None
+            )
+        return _answers_keyboards[key]
     else:
-        today = timezone.now().date()
-        slots = Slot.objects.filter(date=today, booked_by=None)
-        if slots:
-            for btn in slots:
-                builder.button(text=btn.start_time,
-                               callback_data=QuestionAnswerCF(
-                                   question_id=question_id,
-                                   args='slots',
-                                   slot_id=btn.id,
-                                   slot_time=btn.start_time))
-        else:
-            builder.button(text='Не осталось свободных слотов',
-                           callback_data=QuestionAnswerCF(question_id=question_id,
-                                                          args=f'slots',
-                                                          slot_id=0,
-                                                          slot_time='Не выбрано'))
-        return builder.adjust(4).as_markup()
+        return build_slots_keyboard(question_id)
 
 
 def main_keyboard(only_cancel=False):
@@ -106,37 +169,65 @@ def interview_pre_get_list_keyboard(poll_type=None, time_of_day=None):
     return builder.adjust(1).as_markup()
 
 
-@sync_to_async
-def generate_list_polls_keyboard(telegram_user_id, poll_type=None, page=1, time_of_day=None):
-    """Генерирует клавиатуру списка доступных для прохождения опросов по типу, либо все
-    Если опросов более 5, то добавляет пагинационные кнопки"""
+LIST_POLLS_PAGE_SIZE = 5
+
+
+def select_list_polls_page(employee_id, poll_type=None, time_of_day=None, cursor=None, backward=False):
+    """
+    Выбирает страницу непройденных опросов по ключу (poll_number, id) от курсора.
+    Выбирается на один опрос больше размера страницы, чтобы без подсчета понять, есть ли еще страница.
+    Возвращает опросы страницы в порядке показа и флаг наличия следующей страницы в направлении листания
+    """
     today = timezone.now().date()
 
     list_poll_type = [poll_type] if poll_type else [PollType.FEEDBACK, PollType.ONBOARDING, PollType.OFFBOARDING,
                                                     PollType.INTERMEDIATE_FEEDBACK]
-    time_of_day = [time_of_day] if time_of_day else [TimeOfDay.MORNING, TimeOfDay.EVENING]
-
-    employee = Employee.objects.get(telegram_user_id=telegram_user_id)
+    list_time_of_day = [time_of_day] if time_of_day else [TimeOfDay.MORNING, TimeOfDay.EVENING]
 
     polls_planned = (
-        PollStatus.objects.select_related("poll", "employee", "target_employee")
+        PollStatus.objects.select_related("poll", "target_employee")
         .filter(
-            employee=employee,
+            employee_id=employee_id,
             date_planned_at__lte=today,
             status__in=[PollStatus.Status.NOT_STARTED, PollStatus.Status.EXPIRED],
-            time_planned_at__in=time_of_day,
+            is_visible=True,
+            time_planned_at__in=list_time_of_day,
             poll__poll_type__in=list_poll_type,
         )
-        .order_by("poll__poll_number")
     )
-    if not polls_planned:
-        return None
+    if cursor is None:
+        polls_planned = polls_planned.order_by("poll__poll_number", "id")
+    elif backward:
+        poll_number, poll_status_id = cursor
+        polls_planned = polls_planned.filter(
+            Q(poll__poll_number__lt=poll_number) | Q(poll__poll_number=poll_number, id__lt=poll_status_id)
+        ).order_by("-poll__poll_number", "-id")
+    else:
+        poll_number, poll_status_id = cursor
+        polls_planned = polls_planned.filter(
+            Q(poll__poll_number__gt=poll_number) | Q(poll__poll_number=poll_number, id__gt=poll_status_id)
+        ).order_by("poll__poll_number", "id")
 
-    page_size = 5
-    start = (page - 1) * page_size
-    end = start + page_size
+    paginated_polls = list(polls_planned[:LIST_POLLS_PAGE_SIZE + 1])
+    has_more = len(paginated_polls) > LIST_POLLS_PAGE_SIZE
+    paginated_polls = paginated_polls[:LIST_POLLS_PAGE_SIZE]
+    if backward:
+        paginated_polls.reverse()
+    return paginated_polls, has_more
+
+
+@sync_to_async
+def generate_list_polls_keyboard(employee_id, poll_type=None, time_of_day=None, cursor=None, backward=False):
+    """Генерирует клавиатуру списка доступных для прохождения опросов по типу, либо все
+    Если опросов более 5, то добавляет пагинационные кнопки с курсором (poll_number, id) крайнего опроса страницы"""
+    paginated_polls, has_more = select_list_polls_page(employee_id, poll_type, time_of_day, cursor, backward)
+    if not paginated_polls and cursor is not None:
+        # опросы страницы успели пройти - показываем список с начала
+        cursor, backward = None, False
+        paginated_polls, has_more = select_list_polls_page(employee_id, poll_type, time_of_day)
+    if not paginated_polls:
+        return None
 
-    paginated_polls = polls_planned[start:end]
     builder = InlineKeyboardBuilder()
 
     label_type = {PollType.ONBOARDING: 'ИС',
@@ -162,15 +253,25 @@ def generate_list_polls_keyboard(telegram_user_id, poll_type=None, page=1, time_
                            launch_from_list=True)
                        )
 
-    if page > 1:
+    has_previous = has_more if backward else cursor is not None
+    has_next = cursor is not None if backward else has_more
+    first_poll, last_poll = paginated_polls[0], paginated_polls[-1]
+    if has_previous:
         builder.button(
             text="<<",
-            callback_data=ListPollsCF(polls_type=poll_type, page=page - 1)
+            callback_data=ListPollsCF(polls_type=poll_type,
+                                      time_of_day=time_of_day,
+                                      poll_number=first_poll.poll.poll_number,
+                                      poll_status_id=first_poll.id,
+                                      backward=True)
         )
-    if end < len(polls_planned):
+    if has_next:
         builder.button(
             text=">>",
-            callback_data=ListPollsCF(polls_type=poll_type, page=page + 1)
+            callback_data=ListPollsCF(polls_type=poll_type,
+                                      time_of_day=time_of_day,
+                                      poll_number=last_poll.poll.poll_number,
+                                      poll_status_id=last_poll.id)
         )
 
     builder.adjust(1)
@@ -0,0 +1,125 @@
+import asyncio
+import itertools
+import random
+import time
+from typing import Dict, List
+
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.types import Update
+
+from core.management.bot.callback_factory import PollsIdCF
+from core.management.bot.fake_api import FakeBotAPI
+
+# Текст, которым симулируемый сотрудник отвечает на вопросы без кнопок
+LOAD_TEST_TEXT_ANSWER = "Нагрузочный тест: текстовый ответ"
+# Предел шагов одного опроса, чтобы зацикленный граф вопросов не подвесил прогон
+LOAD_TEST_MAX_STEPS = 50
+
+
+class LoadTestDriver:
+    """
+    Прогоняет синтетические апдейты симулируемых сотрудников через диспетчер бота.
+    Сотрудник запускает свои опросы по порядку и отвечает на вопросы, нажимая случайную кнопку
+    последнего сообщения бота (или отправляя текст, если кнопок нет), пока опрос не завершится
+    """
+
+    def __init__(self, bot: Bot, dp: Dispatcher, api: FakeBotAPI, seed: int | None = None):
+        self.bot = bot
+        self.dp = dp
+        self.api = api
+        self.random = random.Random(seed)
+        self.latencies: List[float] = []
+        self.incomplete = 0
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    @staticmethod
+    def make_user(user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"Load {user_id}"}
+
+    @staticmethod
+    def make_chat(user_id: int) -> dict:
+        return {"id": user_id, "type": "private"}
+
+    def callback_update(self, user_id: int, data: str, message_id: int) -> dict:
+        update_id = next(self._update_ids)
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": self.make_user(user_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": {
+                    "message_id": message_id,
+                    "date": int(time.time()),
+                    "chat": self.make_chat(user_id),
+                    "text": "",
+                },
+            },
+        }
+
+    def message_update(self, user_id: int, text: str) -> dict:
+        return {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": self.make_chat(user_id),
+                "from": self.make_user(user_id),
+                "text": text,
+            },
+        }
+
+    async def feed(self, payload: dict):
+        update = Update.model_validate(payload, context={"bot": self.bot})
+        started = time.perf_counter()
+        await self.dp.feed_update(self.bot, update)
+        self.latencies.append(time.perf_counter() - started)
+
+    def inline_buttons(self, user_id: int) -> List[str]:
+        message = self.api.last_message(user_id)
+        reply_markup = message and message["reply_markup"]
+        if not reply_markup or "inline_keyboard" not in reply_markup:
+            return []
+        return [
+            button["callback_data"]
+            for row in reply_markup["inline_keyboard"]
+            for button in row
+            if button.get("callback_data")
+        ]
+
+    async def run_poll(self, user_id: int, poll_id: int):
+        key = StorageKey(bot_id=self.bot.id, chat_id=user_id, user_id=user_id)
+        last_message = self.api.last_message(user_id)
+        await self.feed(self.callback_update(
+            user_id,
+            PollsIdCF(polls_id=poll_id, target_employee_id=0).pack(),
+            last_message["message_id"] if last_message else 0,
+        ))
+        for _ in range(LOAD_TEST_MAX_STEPS):
+            if await self.dp.storage.get_state(key) is None:
+                return
+            buttons = self.inline_buttons(user_id)
+            if buttons:
+                message_id = self.api.last_message(user_id)["message_id"]
+                await self.feed(self.callback_update(user_id, self.random.choice(buttons), message_id))
+            else:
+                await self.feed(self.message_update(user_id, LOAD_TEST_TEXT_ANSWER))
+        self.incomplete += 1
+        await self.dp.storage.set_state(key, None)
+
+    async def run_employee(self, user_id: int, poll_ids: List[int]):
+        for poll_id in poll_ids:
+            await self.run_poll(user_id, poll_id)
+
+    async def run(self, scenarios: Dict[int, List[int]]) -> float:
+        """
+        Запускает всех сотрудников одновременно, возвращает длительность прогона в секундах
+        """
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            self.run_employee(user_id, poll_ids) for user_id, poll_ids in scenarios.items()
+        ])
+        return time.perf_counter() - started
@@ -0,0 +1,148 @@
+import bisect
+import sys
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Tuple
+
+from django.db.backends.signals import connection_created
+
+# Границы корзин гистограмм времени (в секундах) и количества запросов к БД
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Сколько запросов к БД сохраняется для лога медленного апдейта
+SLOW_UPDATE_QUERIES_LIMIT = 50
+
+
+class UpdateStats:
+    """
+    Замеры обработки одного апдейта: хендлер, общее время, время запросов к Telegram и к БД
+    """
+
+    def __init__(self):
+        self.handler = "unhandled"
+        self.wall = 0.0
+        self.telegram_time = 0.0
+        self.telegram_requests: List[Tuple[str, float]] = []
+        self.db_time = 0.0
+        self.queries_count = 0
+        self.queries: List[Tuple[str, float]] = []
+
+    def add_request(self, method: str, elapsed: float):
+        self.telegram_time += elapsed
+        self.telegram_requests.append((method, elapsed))
+
+    def add_query(self, sql: str, elapsed: float):
+        self.db_time += elapsed
+        self.queries_count += 1
+        if len(self.queries) < SLOW_UPDATE_QUERIES_LIMIT:
+            self.queries.append((sql, elapsed))
+
+
+# Замеры апдейта, который обрабатывается в текущем контексте.
+# sync_to_async копирует контекст в поток, поэтому запросы к БД из потоков попадают в тот же объект
+current_update_stats: ContextVar[UpdateStats | None] = ContextVar("current_update_stats", default=None)
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными границами корзин в формате Prometheus
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+
+    def cumulative_counts(self) -> List[Tuple[str, int]]:
+        result = []
+        total = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((str(bucket), total))
+        result.append(("+Inf", self.count))
+        return result
+
+
+class BotMetrics:
+    """
+    Гистограммы обработки апдейтов ботом в памяти процесса с разбивкой по хендлерам
+    """
+
+    METRICS = (
+        ("bot_update_seconds", "Время обработки апдейта", "wall", TIME_BUCKETS),
+        ("bot_telegram_seconds", "Время запросов к Telegram Bot API за апдейт", "telegram_time", TIME_BUCKETS),
+        ("bot_db_seconds", "Время запросов к БД за апдейт", "db_time", TIME_BUCKETS),
+        ("bot_db_queries", "Количество запросов к БД за апдейт", "queries_count", QUERIES_BUCKETS),
+    )
+
+    def __init__(self):
+        self.handlers: Dict[str, Dict[str, Histogram]] = defaultdict(
+            lambda: {name: Histogram(buckets) for name, _, _, buckets in self.METRICS}
+        )
+
+    def observe(self, stats: UpdateStats):
+        histograms = self.handlers[stats.handler]
+        for name, _, attribute, _ in self.METRICS:
+            histograms[name].observe(getattr(stats, attribute))
+
+    def to_prometheus(self) -> str:
+        """
+        Возвращает гистограммы в текстовом формате Prometheus
+        """
+        lines = []
+        for name, description, _, _ in self.METRICS:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} histogram")
+            for handler, histograms in sorted(self.handlers.items()):
+                histogram = histograms[name]
+                for bucket, count in histogram.cumulative_counts():
+                    lines.append(f'{name}_bucket{{handler="{handler}",le="{bucket}"}} {count}')
+                lines.append(f'{name}_sum{{handler="{handler}"}} {histogram.sum}')
+                lines.append(f'{name}_count{{handler="{handler}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = BotMetrics()
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """
+    Обертка выполнения SQL, которая засчитывает запрос обрабатываемому апдейту
+    """
+    stats = current_update_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - started)
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """
+    Подключает обертку SQL к каждому новому соединению с БД (соединения у каждого потока свои)
+    """
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+def enable_query_metrics():
+    connection_created.connect(install_query_wrapper, dispatch_uid="bot_query_metrics")
+
+
+def dump_metrics(signum=None, frame=None):
+    """
+    Выводит гистограммы в stderr (обработчик сигнала SIGUSR1)
+    """
+    sys.stderr.write(metrics.to_prometheus())
+    sys.stderr.flush()
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+from redis.asyncio import Redis
+from redis.exceptions import LockError
+
+from core.management.bot.config import BOT_SLOW_UPDATE_THRESHOLD
+from core.management.bot.metrics import BotMetrics, UpdateStats, current_update_stats
+
+logger = logging.getLogger(__name__)
+
+USER_LOCK_KEY = "BOT_USER_LOCK_{}"
+# Время жизни (в секундах) блокировки пользователя в Redis, если процесс упал, не освободив ее
+USER_LOCK_TIMEOUT = 60
+# Сколько (в секундах) апдейт ждет блокировку в Redis, прежде чем обработаться без нее
+USER_LOCK_BLOCKING_TIMEOUT = 30
+
+
+class UserLockMiddleware(BaseMiddleware):
+    """
+    Последовательная обработка апдейтов одного пользователя.
+    Внутри процесса порядок держит asyncio.Lock (очередь FIFO),
+    между несколькими процессами бота - блокировка в Redis
+    """
+
+    def __init__(self, redis: Redis | None = None):
+        self.redis = redis
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._waiters: Dict[int, int] = {}
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        lock = self._locks.setdefault(user.id, asyncio.Lock())
+        self._waiters[user.id] = self._waiters.get(user.id, 0) + 1
+        try:
+            async with lock:
+                if self.redis is None:
+                    return await handler(event, data)
+                return await self.handle_with_redis_lock(user.id, handler, event, data)
+        finally:
+            self._waiters[user.id] -= 1
+            if not self._waiters[user.id]:
+                del self._waiters[user.id]
+                del self._locks[user.id]
+
+    async def handle_with_redis_lock(self, user_id, handler, event, data):
+        redis_lock = self.redis.lock(
+            USER_LOCK_KEY.format(user_id),
+            timeout=USER_LOCK_TIMEOUT,
+            blocking_timeout=USER_LOCK_BLOCKING_TIMEOUT,
+        )
+        acquired = await redis_lock.acquire()
+        try:
+            return await handler(event, data)
+        finally:
+            if acquired:
+                with suppress(LockError):
+                    await redis_lock.release()
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Замеряет обработку апдейта: общее время, время запросов к Telegram и к БД, количество запросов.
+    Результаты попадают в гистограммы по хендлерам, медленные апдейты логируются со списком запросов
+    """
+
+    def __init__(self, metrics: BotMetrics, slow_threshold: float = BOT_SLOW_UPDATE_THRESHOLD):
+        self.metrics = metrics
+        self.slow_threshold = slow_threshold
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        stats = UpdateStats()
+        token = current_update_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            stats.wall = time.perf_counter() - started
+            current_update_stats.reset(token)
+            self.metrics.observe(stats)
+            if stats.wall >= self.slow_threshold:
+                self.log_slow_update(stats)
+
+    @staticmethod
+    def log_slow_update(stats: UpdateStats):
+        queries = "\n".join(f"  {elapsed * 1000:.1f} мс: {sql}" for sql, elapsed in stats.queries)
+        requests = ", ".join(f"{method} {elapsed * 1000:.1f} мс" for method, elapsed in stats.telegram_requests)
+        logger.warning(
+            "Медленный апдейт %s: %.3f с, Telegram %.3f с (%s), БД %.3f с, запросов %d\n%s",
+            stats.handler,
+            stats.wall,
+            stats.telegram_time,
+            requests,
+            stats.db_time,
+            stats.queries_count,
+            queries,
+        )
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """
+    Записывает в замеры апдейта имя роутера и хендлера, который его обработал.
+    Регистрируется как внутренняя мидлварь диспетчера и действует на хендлеры всех вложенных роутеров
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        stats = current_update_stats.get()
+        handler_object = data.get("handler")
+        if stats is not None and handler_object is not None:
+            router = data.get("event_router")
+            router_name = router.name if router else "dispatcher"
+            stats.handler = f"{router_name}:{handler_object.callback.__name__}"
+        return await handler(event, data)
+
+
+class TelegramRequestMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Засчитывает время запросов к Telegram Bot API обрабатываемому апдейту
+    """
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ):
+        stats = current_update_stats.get()
+        if stats is None:
+            return await make_request(bot, method)
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            stats.add_request(type(method).__name__, time.perf_counter() - started)
@@ -4,6 +4,10 @@ from aiogram.fsm.state import State, StatesGroup
 class ProcessInterview(StatesGroup):
     """
     Состояние бота "В процессе опроса"
+
+    В данных состояния хранятся только айдишники: poll_id, target_employee_id,
+    question_id (текущий вопрос), answers (id отвеченных вопросов), message_id и temp_message_id.
+    Сами вопросы берутся из скомпилированного графа опроса
     """
     interview = State()
 
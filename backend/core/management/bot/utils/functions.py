@@ -4,7 +4,7 @@ from aiogram.types import BufferedInputFile
 from asgiref.sync import sync_to_async
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import IntegrityError
+from django.db import transaction
 from django.utils import timezone
 from django.core.cache import cache
 
@@ -12,39 +12,47 @@ from employees.models import Employee, CuratorEmployees
 from projects.models import Project
 from questions.models import (
     PollQuestion,
-    Question,
-    QuestionCondition,
     UserAnswer,
     PollStatus,
     QuestionType, PollType,
 )
 from feedback.models import FeedbackUser
-from slots.models import Slot
+from slots.utils import book_slot
 from users.utils import verify_token
-from core.tasks import notification_admins
+from core.management.bot.utils.identity import (
+    EmployeeIdentity,
+    invalidate_employee_identity,
+    resolve_employee_identity,
+)
+from core.management.bot.utils.poll_chain import get_previous_poll_ids
+from core.management.bot.utils.poll_graph import (
+    CompiledQuestion,
+    get_poll_graph,
+    get_compiled_question,
+    get_compiled_next_question_id,
+)
+from core.alerts import enqueue_admin_alert
+from core.tasks import flush_admin_alerts, notification_admins
 from collections import defaultdict
 from typing import List, Dict
-from django.db.models import QuerySet
+from django.db.models import Case, F, QuerySet, Value, When
 
 
 @sync_to_async
-def get_employee(telegram_user_id) -> Employee | None:
+def get_employee(telegram_user_id) -> EmployeeIdentity | None:
     """
-    Функция получения сотрудника
+    Функция получения сотрудника (из кэша идентификации)
     """
-    try:
-        employee = Employee.objects.get(telegram_user_id=telegram_user_id)
-        return employee
-    except ObjectDoesNotExist:
-        return None
+    return resolve_employee_identity(telegram_user_id)
 
 
 @sync_to_async
-def update_telegram_nickname(employee, current_nickname):
+def update_telegram_nickname(employee: EmployeeIdentity | Employee, current_nickname):
     """
     Обновляет телеграм ник в БД, если он не совпадает с реальным
     """
     if current_nickname and current_nickname != employee.telegram_nickname:
+        employee = Employee.objects.get(id=employee.id)
         employee.telegram_nickname = current_nickname
         employee.save()
 
@@ -87,12 +95,11 @@ def get_curator_for_employee(employee: Employee) -> Employee | None:
 
 
 @sync_to_async
-def create_feedback_employee(telegram_user_id, description):
+def create_feedback_employee(employee: EmployeeIdentity, description):
     """
     Создает объект обратной связи и уведомляет админов
     """
-    employee = Employee.objects.get(telegram_user_id=telegram_user_id)
-    feedback = FeedbackUser.objects.create(employee=employee, text=description)
+    feedback = FeedbackUser.objects.create(employee_id=employee.id, text=description)
 
     admins = get_admin_telegram_user_id_employee()
     message = (
@@ -105,154 +112,184 @@ def create_feedback_employee(telegram_user_id, description):
 
 def update_poll_status_object(
         poll_id: int,
-        telegram_user_id: int,
+        employee_id: int,
         poll_choices_status: PollStatus.Status,
         target_employee_id=0,
 ):
     """
     Переводит опрос пользователя в нужный статус
     """
-    employee = Employee.objects.get(telegram_user_id=telegram_user_id)
     target_employee_id = None if not target_employee_id else target_employee_id
     poll_status = PollStatus.all_objects.get(
-        employee=employee, poll_id=poll_id, target_employee_id=target_employee_id
+        employee_id=employee_id, poll_id=poll_id, target_employee_id=target_employee_id
     )
     if poll_status.status in [PollStatus.Status.NOT_STARTED, PollStatus.Status.EXPIRED]:
         poll_status.started_at = timezone.now()
     poll_status.status = poll_choices_status
     poll_status.save()
+    if target_employee_id is None:
+        Employee.objects.sync_onboarding_status(id=poll_status.id)
 
 
 @sync_to_async
-def cancel_poll_status(
+def cancel_interview(
         poll_id: int,
-        telegram_user_id: int,
+        employee_id: int,
         target_employee_id=0
 ):
     """
-    Отменяет процесс прохождения опросса
+    Отменяет процесс прохождения опроса в одной транзакции:
+    удаляет все ответы сотрудника на вопросы опроса одним DELETE и сбрасывает статус опроса одним UPDATE
     """
-    employee = Employee.objects.get(telegram_user_id=telegram_user_id)
     target_employee_id = None if not target_employee_id else target_employee_id
-    poll_status = PollStatus.all_objects.get(
-        employee=employee, poll_id=poll_id, target_employee_id=target_employee_id
-    )
-    poll_status.started_at = None
-
     today = timezone.now().date()
-    planned_date = poll_status.date_planned_at
-
-    if planned_date == today:
-        poll_status.status = PollStatus.Status.NOT_STARTED
-    elif planned_date < today:
-        poll_status.status = PollStatus.Status.EXPIRED
-    poll_status.save()
+    with transaction.atomic():
+        UserAnswer.objects.filter(
+            employee_id=employee_id,
+            target_employee_id=target_employee_id,
+            question__poll_id=poll_id,
+        ).delete()
+        PollStatus.all_objects.filter(
+            employee_id=employee_id, poll_id=poll_id, target_employee_id=target_employee_id
+        ).update(
+            started_at=None,
+            status=Case(
+                When(date_planned_at=today, then=Value(PollStatus.Status.NOT_STARTED)),
+                When(date_planned_at__lt=today, then=Value(PollStatus.Status.EXPIRED)),
+                default=F("status"),
+            ),
+        )
+        Employee.objects.sync_onboarding_status(
+            employee_id=employee_id, poll_id=poll_id, target_employee_id=target_employee_id
+        )
 
 
 @sync_to_async
-def completed_poll_status(poll_id, telegram_user_id, target_employee_id=0):
+def completed_poll_status(poll_id, employee_id, target_employee_id=0):
     """
-    Помечает опрос пользователя как завершенный
+    Помечает опрос пользователя как завершенный и обновляет статус онбординга сотрудника
     """
     target_employee_id = None if not target_employee_id else target_employee_id
-    employee = Employee.objects.get(telegram_user_id=telegram_user_id)
-    poll_status = PollStatus.all_objects.get(
-        employee=employee, poll_id=poll_id, target_employee_id=target_employee_id
+    PollStatus.all_objects.filter(
+        employee_id=employee_id, poll_id=poll_id, target_employee_id=target_employee_id
+    ).update(status=PollStatus.Status.COMPLETED, completed_at=timezone.now())
+    Employee.objects.sync_onboarding_status(
+        employee_id=employee_id, poll_id=poll_id, target_employee_id=target_employee_id
     )
-    poll_status.status = PollStatus.Status.COMPLETED
-    poll_status.completed_at = timezone.now()
-    poll_status.save()
 
 
 @sync_to_async
-def get_last_question_and_answer(poll_id, telegram_user_id, target_employee_id=0):
+def get_last_question_and_answer(poll_id, employee_id, target_employee_id=0):
     """
     Возвращает последний вопрос и ответ пользователя по данному опросу.
     """
-    employee = Employee.objects.get(telegram_user_id=telegram_user_id)
-    poll = PollQuestion.all_objects.get(id=poll_id)
     target_employee_id = None if not target_employee_id else target_employee_id
     last_answer = (
         UserAnswer.objects.filter(
-            employee=employee,
-            question__poll=poll,
+            employee_id=employee_id,
+            question__poll_id=poll_id,
             target_employee_id=target_employee_id,
         )
         .order_by("-created_at")
+        .values_list("question_id", "answer")
         .first()
     )
     if last_answer:
-        return last_answer.question, prepared_answer(last_answer.answer)
-    first_question = Question.objects.filter(poll=poll).order_by("id").first()
-    return first_question, None
+        question_id, answer = last_answer
+        return get_compiled_question(question_id), prepared_answer(answer)
+    return get_poll_graph(poll_id).first_question, None
 
 
-@sync_to_async
-def get_poll_status(
-        poll_id: int, telegram_user_id: int, target_employee_id=0, return_object=False
+async def get_poll_status(
+        poll_id: int, employee_id: int, target_employee_id=0, return_object=False
 ) -> PollStatus | PollStatus.Status | None:
     """
     Возвращает статус прохождения опроса пользователя
     """
-    employee = Employee.objects.get(telegram_user_id=telegram_user_id)
     target_employee_id = None if not target_employee_id else target_employee_id
     try:
-        poll_status = PollStatus.all_objects.select_related(
+        poll_status = await PollStatus.all_objects.select_related(
             "poll", "target_employee"
-        ).get(employee=employee, poll_id=poll_id, target_employee_id=target_employee_id)
+        ).aget(employee_id=employee_id, poll_id=poll_id, target_employee_id=target_employee_id)
     except PollStatus.DoesNotExist:
         return None
     return poll_status.status if not return_object else poll_status
 
 
+class InterviewContext:
+    """
+    Данные, которые нужны хендлеру шага опроса: сотрудник, статус его опроса и текущий вопрос
+    """
+
+    __slots__ = ("employee", "poll_status", "question")
+
+    def __init__(self, employee=None, poll_status=None, question=None):
+        self.employee: EmployeeIdentity | None = employee
+        self.poll_status: PollStatus.Status | None = poll_status
+        self.question: CompiledQuestion | None = question
+
+
+@sync_to_async
+def get_interview_context(
+        telegram_user_id: int, poll_id: int, target_employee_id=0, question_id: int | None = None
+) -> InterviewContext:
+    """
+    Одним переходом в поток БД получает сотрудника, статус его опроса и текущий вопрос
+    """
+    employee = resolve_employee_identity(telegram_user_id)
+    if employee is None:
+        return InterviewContext()
+    target_employee_id = None if not target_employee_id else target_employee_id
+    poll_status = (
+        PollStatus.all_objects.filter(
+            employee_id=employee.id, poll_id=poll_id, target_employee_id=target_employee_id
+        )
+        .values_list("status", flat=True)
+        .first()
+    )
+    return InterviewContext(employee, poll_status, get_compiled_question(question_id))
+
+
 @sync_to_async
 def get_question_to_poll_id(
-        poll_id: int, telegram_user_id: int, target_employee_id=0
-) -> List[Question]:
+        poll_id: int, employee_id: int, target_employee_id=0
+) -> List[CompiledQuestion]:
     """
     Функция получения списка вопросов для опроса и установление флага опроса в статус "IN_PROGRESS"
     """
     try:
-        poll = PollQuestion.all_objects.get(id=poll_id)
-        questions = Question.objects.filter(poll=poll)
         update_poll_status_object(
-            poll_id, telegram_user_id, PollStatus.Status.IN_PROGRESS, target_employee_id
+            poll_id, employee_id, PollStatus.Status.IN_PROGRESS, target_employee_id
         )
-        return [question for question in questions]
     except ObjectDoesNotExist:
         return []
+    return list(get_poll_graph(poll_id).questions)
 
 
 @sync_to_async
 def get_next_question_id(question_id: int, answer="some_text") -> int | None:
     """
     Функция получения следующего вопроса по условию ответа
+    Берется из скомпилированного графа опроса без обращения к БД
     """
-    try:
-        question = Question.objects.get(id=question_id)
-    except Question.DoesNotExist:
-        return None
+    return get_compiled_next_question_id(question_id, answer)
 
-    condition = QuestionCondition.objects.filter(
-        previous_question=question, answer_condition=answer
-    ).first()
 
-    if condition:
-        return condition.question.id
-    else:
-        return None
+@sync_to_async
+def get_question_for_id(question_id: int) -> CompiledQuestion | None:
+    """
+    Функция получения вопроса по айдишнику
+    Берется из скомпилированного графа опроса без обращения к БД
+    """
+    return get_compiled_question(question_id)
 
 
 @sync_to_async
-def get_question_for_id(question_id: int) -> Question | None:
+def get_first_question(poll_id: int) -> CompiledQuestion | None:
     """
-    Функция получения вопроса по айдишнику
+    Функция получения первого вопроса опроса из скомпилированного графа
     """
-    try:
-        question = Question.objects.get(id=question_id)
-        return question
-    except ObjectDoesNotExist:
-        return None
+    return get_poll_graph(poll_id).first_question
 
 
 def get_attention_answers_dict(answer: str) -> dict:
@@ -277,15 +314,14 @@ def get_observable_answers_dict() -> dict:
     }
 
 
-@sync_to_async
-def save_user_answer(telegram_user_id, question_id, answer_text, target_employee_id):
+def save_user_answer(employee: EmployeeIdentity, question_id, answer_text, target_employee_id):
     """
     Функция сохранения ответа от пользователя
     Если ответ "плохой" то помечаем его меткой
-    Если ответ уже существует, обновляем его
+    Если ответ уже существует, обновляем его одним запросом INSERT ... ON CONFLICT DO UPDATE
+    Статус риска повышается условным UPDATE, только если сотрудник был "Без проблем"
     """
-    question = Question.objects.get(id=question_id)
-    employee = Employee.objects.get(telegram_user_id=telegram_user_id)
+    question = get_compiled_question(question_id)
 
     code_answer = prepared_answer(answer_text)
     attention_answers = get_attention_answers_dict(code_answer)
@@ -298,112 +334,114 @@ def save_user_answer(telegram_user_id, question_id, answer_text, target_employee
         question.question_type, []
     )
 
-    user_answer = UserAnswer(
-        employee=employee,
-        question=question,
-        answer=answer_text,
-        requires_attention=requires_attention,
-    )
-    if target_employee_id != 0:
-        user_answer.target_employee_id = target_employee_id
+    target_employee_id = target_employee_id or None
+    risk_employee_id = target_employee_id or employee.id
+    is_escalated = False
+    with transaction.atomic():
+        UserAnswer.objects.bulk_create(
+            [
+                UserAnswer(
+                    employee_id=employee.id,
+                    target_employee_id=target_employee_id,
+                    question_id=question.id,
+                    answer=answer_text,
+                    requires_attention=requires_attention,
+                )
+            ],
+            update_conflicts=True,
+            unique_fields=["employee", "target_employee", "question"],
+            update_fields=["answer", "requires_attention"],
+        )
+        if is_set_observable_risk_status:
+            is_escalated = Employee.objects.filter(
+                id=risk_employee_id,
+                risk_status=Employee.RiskStatus.NOPROBLEM,
+            ).update(risk_status=Employee.RiskStatus.OBSERVABLE) > 0
 
-        target_employee = Employee.objects.get(id=target_employee_id)
-        if target_employee.risk_status == Employee.RiskStatus.NOPROBLEM and is_set_observable_risk_status:
-            target_employee.risk_status = Employee.RiskStatus.OBSERVABLE
-            target_employee.save()
-    else:
-        if employee.risk_status == Employee.RiskStatus.NOPROBLEM and is_set_observable_risk_status:
-            employee.risk_status = Employee.RiskStatus.OBSERVABLE
-            employee.save()
-    try:
-        user_answer.save()
-    except IntegrityError:
-        if target_employee_id != 0:
-            user_answer = UserAnswer.objects.get(
-                employee=employee,
-                question=question,
-                target_employee_id=target_employee_id)
-        else:
-            user_answer = UserAnswer.objects.get(
-                employee=employee,
-                question=question)
-        user_answer.answer = answer_text
-        user_answer.save()
+    if is_escalated:
+        # update() не вызывает сигналы, поэтому кэш данных сотрудника сбрасывается явно
+        invalidate_employee_identity(employee if risk_employee_id == employee.id else Employee(id=risk_employee_id))
 
 
-@sync_to_async
-def delete_user_answer(telegram_user_id, question_id, target_employee_id=0):
+async def delete_user_answer(employee_id, question_id, target_employee_id=0):
     """
     Функция удаления ответа от пользователя
     """
-    employee = Employee.objects.get(telegram_user_id=telegram_user_id)
     target_employee_id = None if not target_employee_id else target_employee_id
-    try:
-        user_answer = UserAnswer.objects.get(
-            employee=employee,
-            question_id=question_id,
-            target_employee_id=target_employee_id,
-        )
-        user_answer.delete()
-    except Exception:
-        pass
+    await UserAnswer.objects.filter(
+        employee_id=employee_id,
+        question_id=question_id,
+        target_employee_id=target_employee_id,
+    ).adelete()
+
+
+@sync_to_async
+def record_user_answer(
+        employee: EmployeeIdentity,
+        question: CompiledQuestion,
+        answer_text: str,
+        answer: str,
+        target_employee_id=0,
+        answer_condition="some_text",
+) -> CompiledQuestion | None:
+    """
+    Одним переходом в поток БД сохраняет ответ, уведомляет админов о "плохом" ответе
+    и возвращает следующий вопрос
+    """
+    save_user_answer(employee, question.id, answer_text, target_employee_id)
+    notify_admins(employee=employee, question=question, answer=answer, target_employee_id=target_employee_id)
+    next_question_id = get_compiled_next_question_id(question.id, answer_condition)
+    return get_compiled_question(next_question_id)
 
 
 @sync_to_async
-def booked_slot(telegram_user_id, slot_id):
+def booked_slot(employee_id, slot_id):
     """
     Резервирует слот для созвона
     """
-    employee = Employee.objects.get(telegram_user_id=telegram_user_id)
-    try:
-        slot = Slot.objects.get(id=slot_id)
-    except Slot.DoesNotExist:
-        return False
-    if slot.is_available():
-        slot.booked_by = employee
-        slot.save()
-        return True
-    return False
+    return book_slot(employee_id, slot_id)
+
+
+def check_completion_previous_polls(
+        employee_id: int, poll_ids: List[int], target_employee_id=0
+) -> Dict[int, bool]:
+    """
+    Проверяет статусы предыдущих опросов для пачки опросов одним запросом.
+    Предыдущие опросы берутся из индекса в памяти процесса (poll_chain).
+    Возвращает карту poll_id -> разрешение проходить опрос: ложь если предыдущий опрос не пройден,
+    истина в ином случае, если предыдущего опроса нет или опрос назначен администратором
+    """
+    target_employee_id = None if not target_employee_id else target_employee_id
+    previous_poll_ids = get_previous_poll_ids(poll_ids)
+    statuses = {
+        poll_id: (status, created_by_admin)
+        for poll_id, status, created_by_admin in PollStatus.all_objects.filter(
+            employee_id=employee_id,
+            target_employee_id=target_employee_id,
+            poll_id__in={*poll_ids, *filter(None, previous_poll_ids.values())},
+            is_visible=True,
+        ).values_list("poll_id", "status", "created_by_admin")
+    }
+
+    result = {}
+    for poll_id in poll_ids:
+        previous_poll_id = previous_poll_ids[poll_id]
+        created_by_admin = statuses.get(poll_id, (None, False))[1]
+        if previous_poll_id is None or created_by_admin or previous_poll_id not in statuses:
+            result[poll_id] = True
+        else:
+            result[poll_id] = statuses[previous_poll_id][0] == PollStatus.Status.COMPLETED
+    return result
 
 
 @sync_to_async
 def check_completion_previous_poll(
-        telegram_user_id: int, poll_id: int, target_employee_id=0
+        employee: EmployeeIdentity, poll_id: int, target_employee_id=0
 ):
     """
-    Проверяет статус предыдущих опросов. Возвращает булевое значение - разрешение проходить определенный опрос.
-    Ложь если есть непройденный предыдущий опрос, истина в ином случае или если предыдущих опросов не найдено
+    Проверяет статус предыдущего опроса. Возвращает булевое значение - разрешение проходить определенный опрос
     """
-    employee = Employee.objects.get(telegram_user_id=telegram_user_id)
-    target_employee_id = None if not target_employee_id else target_employee_id
-    poll_status = PollStatus.all_objects.select_related("poll").get(
-        employee=employee, poll_id=poll_id, target_employee_id=target_employee_id
-    )
-
-    if (
-            poll_status.poll.poll_number == 1 or
-            poll_status.created_by_admin or
-            poll_status.poll.is_deleted or
-            poll_status.poll.poll_type == PollType.INTERMEDIATE_FEEDBACK
-    ):
-        return True
-
-    previous_poll = PollQuestion.objects.get(
-        poll_type=poll_status.poll.poll_type,
-        intended_for=employee.role,
-        content_type=poll_status.poll.content_type,
-        object_id=poll_status.poll.object_id,
-        poll_number=poll_status.poll.poll_number - 1,
-    )
-    try:
-        previous_poll_status = PollStatus.all_objects.get(
-            employee=employee,
-            poll_id=previous_poll.id,
-            target_employee_id=target_employee_id,
-        )
-        return previous_poll_status.status == PollStatus.Status.COMPLETED
-    except PollStatus.DoesNotExist:
-        return True
+    return check_completion_previous_polls(employee.id, [poll_id], target_employee_id)[poll_id]
 
 
 def prepared_answer(answer: str) -> str:
@@ -435,7 +473,7 @@ def get_admin_telegram_user_id_employee():
 
 
 def generate_message_for_admins(
-        telegram_user_id: int, question: Question, answer: str, target_employee_id=0
+        employee: EmployeeIdentity, question: CompiledQuestion, answer: str, target_employee_id=0
 ):
     """
     Проверяет тип вопроса и ответ для генерации сообщения админам
@@ -444,7 +482,6 @@ def generate_message_for_admins(
 
     if answer in attention_answers.get(question.question_type, []):
         try:
-            employee = Employee.objects.get(telegram_user_id=telegram_user_id)
             if target_employee_id:
                 target_employee = Employee.objects.get(id=target_employee_id)
                 message = (
@@ -512,25 +549,35 @@ def generate_employees_expired_polls_message_for_admins(
     return message.strip()
 
 
-@sync_to_async
-def send_notification_admins(
-        telegram_user_id: int,
-        question: Question = None,
+def notify_admins(
+        employee: EmployeeIdentity,
+        question: CompiledQuestion = None,
         answer: str = "",
         target_employee_id=0,
         message: str = "",
 ):
-    """Формирует таску на отправку уведомления админам"""
-    if not message:
-        message = generate_message_for_admins(
-            telegram_user_id, question, answer, target_employee_id
-        )
+    """
+    Формирует таску на отправку уведомления админам.
+    Уведомления о "плохих" ответах копятся в очереди и уходят дайджестом
+    """
     if message:
         admins = get_admin_telegram_user_id_employee()
         notification_admins.delay(admins, message)
+        return None
+
+    message = generate_message_for_admins(
+        employee, question, answer, target_employee_id
+    )
+    if message:
+        countdown = enqueue_admin_alert(message)
+        if countdown is not None:
+            flush_admin_alerts.apply_async(countdown=countdown)
     return None
 
 
+send_notification_admins = sync_to_async(notify_admins)
+
+
 def get_book(path: str, welcome=False) -> BufferedInputFile:
     """Получает файл для отправки в бота"""
     with open(path, "rb") as file:
@@ -0,0 +1,87 @@
+import time
+from typing import Dict, Tuple
+
+from django.core.cache import cache
+
+from employees.models import Employee
+
+EMPLOYEE_IDENTITY_KEY = "EMPLOYEE_IDENTITY_{}"
+# обратный ключ employee_id -> telegram_user_id, чтобы сбросить кэш при смене telegram_user_id
+EMPLOYEE_IDENTITY_ID_KEY = "EMPLOYEE_IDENTITY_ID_{}"
+EMPLOYEE_IDENTITY_TIMEOUT = 60 * 60 * 12
+# Время жизни (в секундах) записи в памяти процесса бота
+EMPLOYEE_IDENTITY_LOCAL_TTL = 5
+
+IDENTITY_FIELDS = ("id", "telegram_user_id", "role", "risk_status", "full_name", "telegram_nickname")
+
+
+class EmployeeIdentity:
+    """
+    Минимальный набор данных сотрудника, нужный хендлерам бота
+    """
+
+    __slots__ = IDENTITY_FIELDS
+
+    def __init__(self, id, telegram_user_id, role, risk_status, full_name, telegram_nickname):
+        self.id = id
+        self.telegram_user_id = telegram_user_id
+        self.role = role
+        self.risk_status = risk_status
+        self.full_name = full_name
+        self.telegram_nickname = telegram_nickname
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in IDENTITY_FIELDS}
+
+    def __repr__(self):
+        return f"<EmployeeIdentity {self.id} ({self.telegram_user_id})>"
+
+
+# telegram_user_id -> (данные сотрудника, время загрузки)
+_local_identities: Dict[int, Tuple[EmployeeIdentity, float]] = {}
+
+
+def resolve_employee_identity(telegram_user_id: int) -> EmployeeIdentity | None:
+    """
+    Возвращает данные сотрудника по telegram_user_id.
+    Ищет в памяти процесса, затем в Redis, затем в БД
+    """
+    now = time.monotonic()
+    entry = _local_identities.get(telegram_user_id)
+    if entry and now - entry[1] < EMPLOYEE_IDENTITY_LOCAL_TTL:
+        return entry[0]
+
+    data = cache.get(EMPLOYEE_IDENTITY_KEY.format(telegram_user_id))
+    if data is None:
+        data = (
+            Employee.objects.filter(telegram_user_id=telegram_user_id)
+            .values(*IDENTITY_FIELDS)
+            .first()
+        )
+        if data is None:
+            _local_identities.pop(telegram_user_id, None)
+            return None
+        cache.set_many(
+            {
+                EMPLOYEE_IDENTITY_KEY.format(telegram_user_id): data,
+                EMPLOYEE_IDENTITY_ID_KEY.format(data["id"]): telegram_user_id,
+            },
+            timeout=EMPLOYEE_IDENTITY_TIMEOUT,
+        )
+
+    identity = EmployeeIdentity(**data)
+    _local_identities[telegram_user_id] = (identity, now)
+    return identity
+
+
+def invalidate_employee_identity(employee: Employee):
+    """
+    Сбрасывает закэшированные данные сотрудника (в том числе по прежнему telegram_user_id)
+    """
+    id_key = EMPLOYEE_IDENTITY_ID_KEY.format(employee.id)
+    telegram_user_ids = {employee.telegram_user_id, cache.get(id_key)} - {None}
+    cache.delete_many(
+        [id_key] + [EMPLOYEE_IDENTITY_KEY.format(telegram_user_id) for telegram_user_id in telegram_user_ids]
+    )
+    for telegram_user_id in telegram_user_ids:
+        _local_identities.pop(telegram_user_id, None)
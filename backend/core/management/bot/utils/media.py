@@ -0,0 +1,49 @@
+import hashlib
+import os
+from typing import Dict, Tuple
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+from django.core.cache import cache
+
+from core.management.bot.create_bot import bot
+from core.management.bot.utils.functions import get_book
+
+MEDIA_FILE_ID_KEY = "BOT_MEDIA_FILE_ID_{}_{}"
+
+# путь -> (время изменения файла, хэш содержимого)
+_content_hashes: Dict[str, Tuple[float, str]] = {}
+
+
+def get_content_hash(path: str) -> str:
+    """
+    Возвращает хэш содержимого файла. Файл перечитывается, только если он изменился на диске
+    """
+    modified_at = os.stat(path).st_mtime
+    entry = _content_hashes.get(path)
+    if entry and entry[0] == modified_at:
+        return entry[1]
+    with open(path, "rb") as file:
+        content_hash = hashlib.sha256(file.read()).hexdigest()
+    _content_hashes[path] = (modified_at, content_hash)
+    return content_hash
+
+
+async def send_book(chat_id: int, path: str, welcome=False, **kwargs) -> Message:
+    """
+    Отправляет pdf-памятку по сохраненному в Redis file_id Telegram.
+    Файл загружается только при первой отправке, после изменения его содержимого
+    или если Telegram отклонил сохраненный file_id
+    """
+    key = MEDIA_FILE_ID_KEY.format(path, get_content_hash(path))
+    file_id = await cache.aget(key)
+    if file_id:
+        try:
+            return await bot.send_document(chat_id, document=file_id, **kwargs)
+        except TelegramBadRequest:
+            await cache.adelete(key)
+
+    message = await bot.send_document(chat_id, document=get_book(path, welcome), **kwargs)
+    if message.document:
+        await cache.aset(key, message.document.file_id, timeout=None)
+    return message
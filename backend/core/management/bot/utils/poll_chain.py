@@ -0,0 +1,97 @@
+import time
+from collections import defaultdict
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+
+from questions.models import PollQuestion, PollType
+
+POLL_CHAIN_VERSION_KEY = "POLL_CHAIN_VERSION"
+
+# Как часто (в секундах) процесс бота сверяет версию цепочек опросов с Redis
+POLL_CHAIN_CHECK_INTERVAL = 5
+
+
+class PollChain:
+    """
+    Индекс предыдущих опросов: для каждого шаблона опроса - опрос, который нужно пройти перед ним.
+
+    Attributes:
+        version (int): Версия шаблонов опросов на момент построения.
+        previous (Dict[int, int | None]): Карта poll_id -> id предыдущего опроса (None, если проходить ничего не нужно).
+    """
+
+    def __init__(self, version: int, previous: Dict[int, int | None]):
+        self.version = version
+        self.previous = previous
+
+
+# Индекс процесса и время последней сверки его версии с Redis
+_poll_chain: PollChain | None = None
+_checked_at = 0.0
+
+
+def get_poll_chain_version() -> int:
+    return cache.get(POLL_CHAIN_VERSION_KEY, 0)
+
+
+def invalidate_poll_chain():
+    """
+    Повышает версию цепочек опросов, чтобы все процессы бота перестроили индекс при следующем обращении
+    """
+    global _poll_chain
+    cache.add(POLL_CHAIN_VERSION_KEY, 0, timeout=None)
+    cache.incr(POLL_CHAIN_VERSION_KEY)
+    _poll_chain = None
+
+
+def compile_poll_chain(version: int) -> PollChain:
+    """
+    Строит индекс одним запросом: опросы группируются по типу, адресату и проекту (отделу),
+    предыдущим считается ближайший опрос группы с меньшим номером, поэтому пропуски в нумерации допустимы
+    """
+    groups = defaultdict(list)
+    polls = (
+        PollQuestion.objects.order_by("poll_number", "id")
+        .values_list("id", "poll_type", "intended_for", "content_type_id", "object_id", "poll_number")
+    )
+    for poll_id, poll_type, intended_for, content_type_id, object_id, poll_number in polls:
+        groups[(poll_type, intended_for, content_type_id, object_id)].append((poll_number, poll_id))
+
+    previous = {}
+    for (poll_type, _, _, _), group_polls in groups.items():
+        previous_id, last_number, last_id = None, None, None
+        for poll_number, poll_id in group_polls:
+            if poll_number != last_number:
+                previous_id = last_id
+            if poll_type == PollType.INTERMEDIATE_FEEDBACK or poll_number == 1:
+                previous[poll_id] = None
+            else:
+                previous[poll_id] = previous_id
+            last_number, last_id = poll_number, poll_id
+    return PollChain(version, previous)
+
+
+def get_poll_chain() -> PollChain:
+    """
+    Возвращает индекс предыдущих опросов из памяти процесса.
+    Перестраивает его, если версия шаблонов опросов в Redis изменилась
+    """
+    global _poll_chain, _checked_at
+    now = time.monotonic()
+    if _poll_chain is not None and now - _checked_at < POLL_CHAIN_CHECK_INTERVAL:
+        return _poll_chain
+
+    version = get_poll_chain_version()
+    if _poll_chain is None or _poll_chain.version != version:
+        _poll_chain = compile_poll_chain(version)
+    _checked_at = now
+    return _poll_chain
+
+
+def get_previous_poll_ids(poll_ids: Iterable[int]) -> Dict[int, int | None]:
+    """
+    Возвращает карту poll_id -> id предыдущего опроса для пачки опросов
+    """
+    previous = get_poll_chain().previous
+    return {poll_id: previous.get(poll_id) for poll_id in poll_ids}
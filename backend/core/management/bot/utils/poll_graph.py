@@ -0,0 +1,190 @@
+import time
+from typing import Dict, List, Tuple
+
+from django.core.cache import cache
+
+from questions.models import Question, QuestionCondition
+
+POLL_GRAPH_VERSION_KEY = "POLL_GRAPH_VERSION_{}"
+
+# Как часто (в секундах) процесс бота сверяет версию скомпилированного опроса с Redis
+POLL_GRAPH_CHECK_INTERVAL = 5
+
+
+class CompiledQuestion:
+    """
+    Снимок вопроса, которого достаточно для проведения опроса в боте.
+    Повторяет атрибуты модели Question, используемые хендлерами
+    """
+
+    __slots__ = ("id", "poll_id", "text", "question_type", "show")
+
+    def __init__(self, id: int, poll_id: int, text: str, question_type: str, show: bool):
+        self.id = id
+        self.poll_id = poll_id
+        self.text = text
+        self.question_type = question_type
+        self.show = show
+
+    def __repr__(self):
+        return f"<CompiledQuestion {self.id} ({self.question_type})>"
+
+
+class CompiledPoll:
+    """
+    Скомпилированный шаблон опроса.
+
+    Attributes:
+        id (int): Идентификатор шаблона опроса (PollQuestion).
+        version (int): Версия шаблона на момент компиляции.
+        questions (List[CompiledQuestion]): Вопросы опроса в порядке id.
+        transitions (Dict[Tuple[int, str], int]): Карта (previous_question_id, answer_condition) -> question_id.
+    """
+
+    def __init__(
+            self,
+            poll_id: int,
+            version: int,
+            questions: List[CompiledQuestion],
+            transitions: Dict[Tuple[int, str], int],
+    ):
+        self.id = poll_id
+        self.version = version
+        self.questions = questions
+        self.transitions = transitions
+        self._questions_by_id = {question.id: question for question in questions}
+
+    @property
+    def first_question(self) -> CompiledQuestion | None:
+        return self.questions[0] if self.questions else None
+
+    def get_question(self, question_id: int | None) -> CompiledQuestion | None:
+        return self._questions_by_id.get(question_id)
+
+    def get_next_question_id(self, question_id: int, answer="some_text") -> int | None:
+        return self.transitions.get((question_id, answer))
+
+
+# poll_id -> (скомпилированный опрос, время последней сверки версии)
+_compiled_polls: Dict[int, Tuple[CompiledPoll, float]] = {}
+# question_id -> poll_id
+_question_poll_index: Dict[int, int] = {}
+
+
+def get_poll_graph_version(poll_id: int) -> int:
+    """
+    Возвращает текущую версию шаблона опроса из Redis
+    """
+    return cache.get(POLL_GRAPH_VERSION_KEY.format(poll_id), 0)
+
+
+def invalidate_poll_graph(poll_id: int | None):
+    """
+    Повышает версию шаблона опроса, чтобы все процессы бота перекомпилировали его при следующем обращении
+    """
+    if poll_id is None:
+        return
+    key = POLL_GRAPH_VERSION_KEY.format(poll_id)
+    cache.add(key, 0, timeout=None)
+    cache.incr(key)
+    _compiled_polls.pop(poll_id, None)
+
+
+def compile_poll(poll_id: int, version: int) -> CompiledPoll:
+    """
+    Собирает вопросы и условия переходов шаблона опроса в структуру в памяти
+    """
+    questions = [
+        CompiledQuestion(
+            id=question["id"],
+            poll_id=poll_id,
+            text=question["text"],
+            question_type=question["question_type"],
+            show=question["show"],
+        )
+        for question in Question.objects.filter(poll_id=poll_id)
+        .order_by("id")
+        .values("id", "text", "question_type", "show")
+    ]
+
+    transitions = {}
+    conditions = (
+        QuestionCondition.objects.filter(previous_question__poll_id=poll_id)
+        .order_by("id")
+        .values_list("previous_question_id", "answer_condition", "question_id")
+    )
+    for previous_question_id, answer_condition, question_id in conditions:
+        # при дублирующихся условиях побеждает первое, как и при QuestionCondition...first()
+        transitions.setdefault((previous_question_id, answer_condition), question_id)
+
+    return CompiledPoll(poll_id, version, questions, transitions)
+
+
+def get_poll_graph(poll_id: int, force: bool = False) -> CompiledPoll:
+    """
+    Возвращает скомпилированный опрос из памяти процесса.
+    Перекомпилирует его, если версия шаблона в Redis изменилась или передан force
+    """
+    now = time.monotonic()
+    entry = _compiled_polls.get(poll_id)
+    if not force and entry and now - entry[1] < POLL_GRAPH_CHECK_INTERVAL:
+        return entry[0]
+
+    version = get_poll_graph_version(poll_id)
+    if not force and entry and entry[0].version == version:
+        compiled_poll = entry[0]
+    else:
+        compiled_poll = compile_poll(poll_id, version)
+        for question in compiled_poll.questions:
+            _question_poll_index[question.id] = poll_id
+
+    _compiled_polls[poll_id] = (compiled_poll, now)
+    return compiled_poll
+
+
+def get_question_poll_id(question_id: int) -> int | None:
+    """
+    Возвращает id шаблона опроса, к которому относится вопрос
+    """
+    poll_id = _question_poll_index.get(question_id)
+    if poll_id is None:
+        poll_id = (
+            Question.objects.filter(id=question_id)
+            .values_list("poll_id", flat=True)
+            .first()
+        )
+        if poll_id is not None:
+            _question_poll_index[question_id] = poll_id
+    return poll_id
+
+
+def get_compiled_question(question_id: int | None) -> CompiledQuestion | None:
+    """
+    Возвращает вопрос по айдишнику из скомпилированного опроса
+    """
+    if question_id is None:
+        return None
+    poll_id = get_question_poll_id(question_id)
+    if poll_id is None:
+        return None
+    question = get_poll_graph(poll_id).get_question(question_id)
+    if question is None:
+        # вопрос добавили или перенесли в другой опрос, а граф или индекс еще не обновились:
+        # один раз перечитываем опрос вопроса из БД в обход интервала проверки версии
+        _question_poll_index.pop(question_id, None)
+        poll_id = get_question_poll_id(question_id)
+        if poll_id is None:
+            return None
+        question = get_poll_graph(poll_id, force=True).get_question(question_id)
+    return question
+
+
+def get_compiled_next_question_id(question_id: int, answer="some_text") -> int | None:
+    """
+    Возвращает id следующего вопроса по условию ответа из скомпилированного опроса
+    """
+    poll_id = get_question_poll_id(question_id)
+    if poll_id is None:
+        return None
+    return get_poll_graph(poll_id).get_next_question_id(question_id, answer)
+
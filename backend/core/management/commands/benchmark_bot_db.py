@@ -0,0 +1,100 @@
+import asyncio
+import statistics
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandParser
+
+from core.management.bot.utils.functions import get_interview_context, get_next_question_id
+from employees.models import Employee
+from questions.models import PollStatus, Question, QuestionCondition
+
+
+async def legacy_update(telegram_user_id, poll_id, target_employee_id, question_id):
+    """
+    Последовательность переходов в поток, которую хендлер шага опроса делал до пакетной загрузки
+    """
+    employee = await sync_to_async(Employee.objects.get)(telegram_user_id=telegram_user_id)
+    await sync_to_async(
+        lambda: PollStatus.all_objects.get(
+            employee=employee, poll_id=poll_id, target_employee_id=target_employee_id
+        ).status
+    )()
+    question = await sync_to_async(Question.objects.get)(id=question_id)
+    condition = await sync_to_async(
+        lambda: QuestionCondition.objects.filter(previous_question=question, answer_condition="yes").first()
+    )()
+    if condition:
+        await sync_to_async(lambda: condition.question.id)()
+
+
+async def batched_update(telegram_user_id, poll_id, target_employee_id, question_id):
+    """
+    Пакетная загрузка данных шага опроса и переход по скомпилированному графу
+    """
+    await get_interview_context(telegram_user_id, poll_id, target_employee_id, question_id)
+    await get_next_question_id(question_id, "yes")
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер задержки получения данных шага опроса ботом под конкурентной нагрузкой: "
+        "последовательные переходы в поток (legacy) против пакетной загрузки (batched)"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--users", type=int, default=50, help="Количество одновременных пользователей")
+        parser.add_argument("--updates", type=int, default=20, help="Количество апдейтов на пользователя")
+
+    def handle(self, *args, **options):
+        users = options["users"]
+        updates = options["updates"]
+
+        poll_statuses = list(
+            PollStatus.all_objects.filter(employee__telegram_user_id__isnull=False)
+            .values_list("employee__telegram_user_id", "poll_id", "target_employee_id")[:users]
+        )
+        if not poll_statuses:
+            self.stderr.write(self.style.ERROR("Нет опросов у сотрудников с telegram_user_id"))
+            return
+
+        first_questions = {}
+        for poll_id, question_id in (
+            Question.objects.filter(poll_id__in={poll_id for _, poll_id, _ in poll_statuses})
+            .order_by("-id")
+            .values_list("poll_id", "id")
+        ):
+            first_questions[poll_id] = question_id
+        scenarios = [
+            (telegram_user_id, poll_id, target_employee_id, first_questions[poll_id])
+            for telegram_user_id, poll_id, target_employee_id in poll_statuses
+            if poll_id in first_questions
+        ]
+
+        for mode, update in (("legacy", legacy_update), ("batched", batched_update)):
+            latencies, elapsed = asyncio.run(self.run_users(update, scenarios, updates))
+            self.report(mode, latencies, elapsed)
+
+    @staticmethod
+    async def run_users(update, scenarios, updates):
+        latencies = []
+
+        async def user(scenario):
+            for _ in range(updates):
+                started = time.perf_counter()
+                await update(*scenario)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[user(scenario) for scenario in scenarios])
+        return latencies, time.perf_counter() - started
+
+    def report(self, mode, latencies, elapsed):
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        self.stdout.write(
+            f"{mode}: апдейтов {len(latencies)}, "
+            f"p50 {percentiles[49] * 1000:.1f} мс, "
+            f"p95 {percentiles[94] * 1000:.1f} мс, "
+            f"p99 {percentiles[98] * 1000:.1f} мс, "
+            f"{len(latencies) / elapsed:.1f} апдейтов/с"
+        )
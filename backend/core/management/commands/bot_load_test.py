@@ -0,0 +1,172 @@
+import asyncio
+import statistics
+import time
+
+from aiogram.client.telegram import TelegramAPIServer
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils import timezone
+
+from core.async_runtime import stop_async_runtime
+from core.management.bot.create_bot import bot, dp
+from core.management.bot.fake_api import FakeBotAPI
+from core.management.bot.load_test import LoadTestDriver
+from core.management.bot.metrics import metrics
+from core.management.commands.start_bot import setup_dispatcher
+from employees.models import Employee
+from projects.models import Project
+from questions.models import PollQuestion, PollStatus, PollType, TimeOfDay, UserType
+from questions.tasks import schedule_notification_poll_onboarding
+
+# Начало диапазона telegram_user_id симулируемых сотрудников (вне диапазона реальных аккаунтов)
+LOAD_TEST_TELEGRAM_ID_BASE = 10 ** 12
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест бота без сети: N одновременных сотрудников проходят опросы адаптации "
+        "тестового проекта через диспетчер бота, Telegram Bot API подменяется локальной имитацией. "
+        "Выводит p50/p95/p99 задержки апдейта, апдейты в секунду и запросы к БД на апдейт. "
+        "Тестовые данные удаляются после прогона. Запускать только на локальной БД: "
+        "с флагом --notifications выполняются задачи рассылки по всей базе"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--users", type=int, default=50, help="Количество одновременных сотрудников")
+        parser.add_argument("--polls", type=int, default=2, help="Сколько опросов по порядку проходит каждый сотрудник")
+        parser.add_argument("--api-latency", type=float, default=0, help="Задержка ответа имитации Bot API в мс")
+        parser.add_argument("--api-host", default="127.0.0.1", help="Адрес имитации Bot API")
+        parser.add_argument("--api-port", type=int, default=8081, help="Порт имитации Bot API")
+        parser.add_argument("--seed", type=int, default=None, help="Зерно выбора ответов")
+        parser.add_argument(
+            "--notifications",
+            action="store_true",
+            help="Перед прогоном выполнить задачи рассылки уведомлений об опросах адаптации",
+        )
+
+    def handle(self, *args, **options):
+        if not bot:
+            raise CommandError("Токен бота не задан (для теста подойдет любой вида 123456:fake)")
+
+        api = FakeBotAPI(latency=options["api_latency"] / 1000)
+        api.start_in_thread(options["api_host"], options["api_port"])
+        bot.session.api = TelegramAPIServer.from_base(f"http://{options['api_host']}:{options['api_port']}")
+        setup_dispatcher()
+
+        project, scenarios = self.seed(options["users"], options["polls"])
+        try:
+            if options["notifications"]:
+                self.run_notifications()
+            metrics.handlers.clear()
+            driver = LoadTestDriver(bot, dp, api, seed=options["seed"])
+            elapsed = asyncio.run(self.run_driver(driver, scenarios))
+            self.report(driver, elapsed, api)
+        finally:
+            self.cleanup(project)
+
+    @staticmethod
+    def seed(users_count, polls_count):
+        """
+        Создает тестовый проект (шаблоны опросов создает сигнал проекта), сотрудников и их статусы опросов на сегодня
+        """
+        today = timezone.now().date()
+        project = Project.objects.create(name=f"Нагрузочный тест {timezone.now():%Y-%m-%d %H:%M:%S}")
+        polls = list(
+            PollQuestion.objects.filter(
+                content_type=ContentType.objects.get_for_model(Project),
+                object_id=project.id,
+                intended_for=UserType.EMPLOYEE,
+                poll_type=PollType.ONBOARDING,
+            ).order_by("poll_number")[:polls_count]
+        )
+
+        telegram_id_base = LOAD_TEST_TELEGRAM_ID_BASE + project.id * 100000
+        users = get_user_model().objects.bulk_create([
+            get_user_model()(email=f"load_test_{project.id}_{number}@example.com")
+            for number in range(users_count)
+        ])
+        employees = Employee.objects.bulk_create([
+            Employee(
+                user=user,
+                full_name=f"Нагрузочный тест {number}",
+                telegram_nickname=f"load_test_{number}",
+                telegram_user_id=telegram_id_base + number,
+                date_of_employment=today,
+            )
+            for number, user in enumerate(users)
+        ])
+        PollStatus.objects.bulk_create([
+            PollStatus(
+                employee=employee,
+                poll=poll,
+                date_planned_at=today,
+                time_planned_at=poll.time_of_day,
+            )
+            for employee in employees
+            for poll in polls
+        ])
+        scenarios = {employee.telegram_user_id: [poll.id for poll in polls] for employee in employees}
+        return project, scenarios
+
+    def run_notifications(self):
+        """
+        Выполняет задачи рассылки в текущем процессе, вместо Celery
+        """
+        try:
+            for time_of_day in (TimeOfDay.MORNING, TimeOfDay.EVENING):
+                started = time.perf_counter()
+                result = schedule_notification_poll_onboarding(time_of_day)
+                self.stdout.write(
+                    f"рассылка {time_of_day}: {result}, {time.perf_counter() - started:.2f} с"
+                )
+        finally:
+            # сессия бота привязана к циклу событий задач, прогон опросов откроет свою
+            stop_async_runtime()
+
+    @staticmethod
+    async def run_driver(driver, scenarios):
+        try:
+            return await driver.run(scenarios)
+        finally:
+            await bot.session.close()
+
+    def report(self, driver, elapsed, api):
+        latencies = driver.latencies
+        if not latencies:
+            self.stderr.write(self.style.ERROR("Не обработано ни одного апдейта"))
+            return
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        self.stdout.write(
+            f"апдейтов {len(latencies)}, "
+            f"p50 {percentiles[49] * 1000:.1f} мс, "
+            f"p95 {percentiles[94] * 1000:.1f} мс, "
+            f"p99 {percentiles[98] * 1000:.1f} мс, "
+            f"{len(latencies) / elapsed:.1f} апдейтов/с"
+        )
+
+        queries = updates = 0
+        for handler, histograms in sorted(metrics.handlers.items()):
+            histogram = histograms["bot_db_queries"]
+            queries += histogram.sum
+            updates += histogram.count
+            self.stdout.write(
+                f"  {handler}: апдейтов {histogram.count}, "
+                f"запросов к БД на апдейт {histogram.sum / histogram.count:.1f}"
+            )
+        if updates:
+            self.stdout.write(f"запросов к БД на апдейт в среднем: {queries / updates:.1f}")
+        self.stdout.write(f"вызовы Bot API: {dict(sorted(api.calls.items()))}")
+        if driver.incomplete:
+            self.stderr.write(self.style.WARNING(f"Не завершено опросов: {driver.incomplete}"))
+
+    @staticmethod
+    def cleanup(project):
+        """
+        Удаляет тестовые данные физически: сотрудники удаляются каскадом вместе с пользователями
+        """
+        get_user_model().objects.filter(email__startswith=f"load_test_{project.id}_").delete()
+        PollQuestion.objects.filter(
+            content_type=ContentType.objects.get_for_model(Project), object_id=project.id
+        ).delete()
+        Project.all_objects.filter(id=project.id).delete()
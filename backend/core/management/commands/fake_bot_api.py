@@ -0,0 +1,19 @@
+from aiohttp import web
+from django.core.management.base import BaseCommand, CommandParser
+
+from core.management.bot.fake_api import FakeBotAPI
+
+
+class Command(BaseCommand):
+    help = (
+        "Локальная имитация Telegram Bot API для нагрузочного тестирования бота без сети. "
+        "Бот направляется на нее через BOT_API_URL"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--host", default="127.0.0.1", help="Адрес сервера")
+        parser.add_argument("--port", type=int, default=8081, help="Порт сервера")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Fake Bot API: http://{options['host']}:{options['port']}"))
+        web.run_app(FakeBotAPI().create_app(), host=options["host"], port=options["port"], print=None)
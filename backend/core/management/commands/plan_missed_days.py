@@ -1,9 +1,17 @@
-from datetime import datetime
+from datetime import date, datetime
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from questions.planning import plan_poll_statuses
 from questions.tasks import schedule_create_pollstatuses
 
 
+def parse_day(value: str) -> date:
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError as e:
+        raise CommandError(f'Ошибка парсинга дат: {e}')
+
+
 class Command(BaseCommand):
     help = ('Команда которая позволяет встроить в график те опросы, которые по любым причинам не встроились сами ('
             'например лежал планировщик)')
@@ -15,11 +23,31 @@ class Command(BaseCommand):
             type=str,
             help='Список дней для которых запланировать создание опросов в YYYY-MM-DD формате'
         )
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            type=str,
+            help='Начало интервала пропущенных дней в YYYY-MM-DD формате: опросы за весь интервал создаются сразу, '
+                 'одним проходом'
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            type=str,
+            help='Конец интервала пропущенных дней в YYYY-MM-DD формате (по умолчанию - сегодня)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать недостающие опросы по дням, ничего не создавая'
+        )
 
     def handle(self, *args, **options):
         days = options['days']
 
-        if days:
+        if options['date_from']:
+            self.plan_range(options)
+        elif days:
             try:
                 list_days = [datetime.strptime(day, '%Y-%m-%d').date() for day in days]
                 schedule_create_pollstatuses.delay(list_days)
@@ -28,4 +56,24 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.ERROR(f'Ошибка парсинга дат: {e}'))
         else:
             schedule_create_pollstatuses.delay()
-            self.stdout.write(self.style.SUCCESS('Создание опросов запланировано для вчерашнего и сегодняшнего дня'))
\ No newline at end of file
+            self.stdout.write(self.style.SUCCESS('Создание опросов запланировано для вчерашнего и сегодняшнего дня'))
+
+    def plan_range(self, options):
+        """
+        Создает опросы за весь интервал пропущенных дней одним проходом
+        """
+        date_from = parse_day(options['date_from'])
+        date_to = parse_day(options['date_to']) if options['date_to'] else date.today()
+        if date_from > date_to:
+            raise CommandError('Начало интервала позже его конца')
+
+        dry_run = options['dry_run']
+        result = plan_poll_statuses(date_from, date_to, dry_run=dry_run)
+
+        for day, count in sorted(result.by_day.items()):
+            self.stdout.write(f'{day.isoformat()}: {count}')
+        verb = 'Будет создано' if dry_run else 'Создано'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} опросов за {date_from.isoformat()} - {date_to.isoformat()}: {result.planned} '
+            f'(уже существовало: {result.skipped}, {result.elapsed:.2f} с)'
+        ))
@@ -1,11 +1,52 @@
 import asyncio
+import multiprocessing
+import signal
 
-from django.core.management.base import BaseCommand
+from aiogram.fsm.storage.redis import RedisStorage
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connections
 
+from core.management.bot.config import WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT
 from core.management.bot.create_bot import bot, dp, set_bot_commands
 from core.management.bot.handlers.commands_handlers import router as command_router
 from core.management.bot.handlers.callbacks_handlers import router as callback_router
 from core.management.bot.handlers.messages_handlers import router as message_router
+from core.management.bot.metrics import metrics, enable_query_metrics, dump_metrics
+from core.management.bot.middlewares import (
+    UserLockMiddleware,
+    UpdateMetricsMiddleware,
+    HandlerNameMiddleware,
+    TelegramRequestMetricsMiddleware,
+)
+
+
+def setup_dispatcher(webhook=False):
+    """
+    Подключает роутеры и мидлвари к диспетчеру.
+    В режиме вебхука порядок апдейтов пользователя между процессами держит блокировка в Redis.
+    Замеры хендлеров выводятся в stderr по сигналу SIGUSR1 (в режиме вебхука также доступны по /metrics)
+    """
+    dp.include_router(command_router)
+    dp.include_router(callback_router)
+    dp.include_router(message_router)
+    redis = dp.storage.redis if webhook and isinstance(dp.storage, RedisStorage) else None
+    dp.update.outer_middleware(UserLockMiddleware(redis))
+
+    dp.update.outer_middleware(UpdateMetricsMiddleware(metrics))
+    dp.message.middleware(HandlerNameMiddleware())
+    dp.callback_query.middleware(HandlerNameMiddleware())
+    bot.session.middleware(TelegramRequestMetricsMiddleware())
+    enable_query_metrics()
+    signal.signal(signal.SIGUSR1, dump_metrics)
+
+
+async def metrics_handler(request):
+    """
+    Отдает замеры хендлеров процесса в текстовом формате Prometheus
+    """
+    return web.Response(text=metrics.to_prometheus(), content_type='text/plain')
 
 
 async def start_bot():
@@ -13,15 +54,73 @@ async def start_bot():
         raise Exception('Токен бота не задан')
     await bot.delete_webhook(drop_pending_updates=True)
     await set_bot_commands()
-    dp.include_router(command_router)
-    dp.include_router(callback_router)
-    dp.include_router(message_router)
+    setup_dispatcher()
     await dp.start_polling(bot)
 
 
+async def set_webhook():
+    """
+    Регистрирует вебхук в Telegram. Выполняется один раз в главном процессе
+    """
+    await bot.set_webhook(
+        WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+        drop_pending_updates=True,
+    )
+    await set_bot_commands()
+    # сессия привязана к циклу событий главного процесса, воркеры создадут свои
+    await bot.session.close()
+
+
+def run_webhook_worker(host, port):
+    """
+    Процесс-воркер, принимающий апдейты от Telegram по вебхуку
+    """
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    app.router.add_get('/metrics', metrics_handler)
+    # reuse_port позволяет нескольким воркерам слушать один порт, ядро распределяет соединения между ними
+    web.run_app(app, host=host, port=port, reuse_port=True, print=None)
+
+
+def start_bot_webhook(host, port, workers):
+    if not bot:
+        raise Exception('Токен бота не задан')
+    if not WEBHOOK_URL:
+        raise Exception('Адрес вебхука не задан')
+    setup_dispatcher(webhook=True)
+    asyncio.run(set_webhook())
+
+    if workers == 1:
+        run_webhook_worker(host, port)
+        return
+
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=run_webhook_worker, args=(host, port)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
 class Command(BaseCommand):
     help = 'Телеграм бот'
 
-    def handle(self, *args, **kwargs):
-        asyncio.run(start_bot())
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--webhook', action='store_true', help='Принимать апдейты по вебхуку вместо long polling')
+        parser.add_argument('--host', default=WEBHOOK_HOST, help='Адрес сервера вебхука')
+        parser.add_argument('--port', type=int, default=WEBHOOK_PORT, help='Порт сервера вебхука')
+        parser.add_argument('--workers', type=int, default=1, help='Количество процессов-воркеров вебхука')
 
+    def handle(self, *args, **options):
+        if options['webhook']:
+            start_bot_webhook(options['host'], options['port'], options['workers'])
+        else:
+            asyncio.run(start_bot())
@@ -1,8 +1,9 @@
-import asyncio
 from typing import List
 
 from celery import shared_task
 
+from core.alerts import build_admin_digests, pop_admin_alerts
+from core.async_runtime import run_async
 from core.utils import send_message_to_admins
 
 
@@ -12,5 +13,19 @@ def notification_admins(admins: List[int], message: str):
     Celery-функция которая ставит задачу для рассылки по админам
     """
     if admins:
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(send_message_to_admins(admins, message))
+        run_async(send_message_to_admins(admins, message))
+
+
+@shared_task
+def flush_admin_alerts():
+    """
+    Celery-функция которая отправляет админам накопленные уведомления дайджестом
+    """
+    # локальный импорт: модуль функций бота сам импортирует задачи отсюда
+    from core.management.bot.utils.functions import get_admin_telegram_user_id_employee
+
+    messages = pop_admin_alerts()
+    admins = get_admin_telegram_user_id_employee()
+    if messages and admins:
+        for digest in build_admin_digests(messages):
+            run_async(send_message_to_admins(admins, digest))
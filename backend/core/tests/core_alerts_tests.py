@@ -0,0 +1,44 @@
+from core.alerts import TELEGRAM_MESSAGE_LIMIT, build_admin_digests
+
+
+def test_build_admin_digests_respects_message_limit():
+    # Arrange
+    messages = [f"Сотрудник {number} ответил: " + "а" * 1000 for number in range(10)]
+
+    # Act
+    digests = build_admin_digests(messages)
+
+    # Assert
+    assert len(digests) > 1
+    assert all(len(digest) <= TELEGRAM_MESSAGE_LIMIT for digest in digests)
+    assert sum(digest.count("Сотрудник") for digest in digests) == len(messages)
+
+
+def test_build_admin_digests_keeps_single_alert_as_is():
+    # Arrange
+    messages = ["Сотрудник ответил: Нет"]
+
+    # Act
+    digests = build_admin_digests(messages)
+
+    # Assert
+    assert digests == messages
+
+
+def test_build_admin_digests_truncates_oversized_alert_keeping_markup():
+    # Arrange
+    messages = [
+        'Сотрудник ответил:\n<strong>"' + "а" * TELEGRAM_MESSAGE_LIMIT + '"</strong>',
+        "Сотрудник ответил: Нет",
+    ]
+
+    # Act
+    digests = build_admin_digests(messages)
+    single = build_admin_digests(messages[:1])
+
+    # Assert
+    assert all(len(digest) <= TELEGRAM_MESSAGE_LIMIT for digest in digests + single)
+    assert digests[0].startswith("<strong>Ответы, требующие внимания (2):</strong>")
+    assert "Сотрудник ответил:" in digests[0]
+    assert sum(digest.count("Сотрудник") for digest in digests) == len(messages)
+    assert single[0].endswith("…</strong>")
@@ -0,0 +1,22 @@
+import asyncio
+
+from core.async_runtime import run_async, stop_async_runtime
+
+
+def test_run_async_reuses_one_loop_between_calls():
+    # Arrange
+    async def current_loop():
+        await asyncio.sleep(0)
+        return asyncio.get_running_loop()
+
+    # Act
+    first_loop = run_async(current_loop())
+    second_loop = run_async(current_loop())
+    stop_async_runtime()
+    restarted_loop = run_async(current_loop())
+    stop_async_runtime()
+
+    # Assert
+    assert first_loop is second_loop
+    assert first_loop.is_closed()
+    assert restarted_loop is not first_loop
@@ -0,0 +1,23 @@
+from core.management.bot.metrics import BotMetrics, UpdateStats
+
+
+def test_bot_metrics_prometheus_histograms():
+    # Arrange
+    metrics = BotMetrics()
+    stats = UpdateStats()
+    stats.handler = "callbacks-router:process_interview_handler"
+    stats.wall = 0.2
+    stats.add_request("SendMessage", 0.15)
+    stats.add_query("SELECT 1", 0.01)
+    stats.add_query("SELECT 2", 0.02)
+
+    # Act
+    metrics.observe(stats)
+    text = metrics.to_prometheus()
+
+    # Assert
+    handler = 'handler="callbacks-router:process_interview_handler"'
+    assert f'bot_update_seconds_bucket{{{handler},le="0.1"}} 0' in text
+    assert f'bot_update_seconds_bucket{{{handler},le="0.25"}} 1' in text
+    assert f"bot_db_queries_sum{{{handler}}} 2.0" in text
+    assert f"bot_telegram_seconds_count{{{handler}}} 1" in text
@@ -0,0 +1,43 @@
+import asyncio
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from core.broadcast import BroadcastMessage, Broadcaster
+
+
+class FakeBot:
+    """
+    Бот, который отвечает 429 на первое сообщение в чат 1 и не может писать в чат 2
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.is_limited = True
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        method = SendMessage(chat_id=chat_id, text=text)
+        if chat_id == 1 and self.is_limited:
+            self.is_limited = False
+            raise TelegramRetryAfter(method=method, message="Flood control exceeded", retry_after=0)
+        if chat_id == 2:
+            raise TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+        self.sent.append((chat_id, text))
+
+
+def test_broadcaster_requeues_after_retry_after_and_keeps_chat_order():
+    # Arrange
+    bot = FakeBot()
+    messages = [
+        BroadcastMessage(1, "первое"),
+        BroadcastMessage(1, "второе"),
+        BroadcastMessage(2, "заблокирован"),
+        BroadcastMessage(3, "третье"),
+    ]
+
+    # Act
+    result = asyncio.run(Broadcaster(bot, rate=1000, chat_interval=0).send(messages))
+
+    # Assert
+    assert result.to_dict() | {"elapsed": 0} == {"sent": 3, "failed": 1, "retried": 1, "elapsed": 0}
+    assert [text for chat_id, text in bot.sent if chat_id == 1] == ["первое", "второе"]
@@ -0,0 +1,25 @@
+import json
+
+from core.management.bot.fake_api import FakeBotAPI
+from core.management.bot.load_test import LoadTestDriver
+
+
+def test_load_test_driver_reads_buttons_of_last_sent_message():
+    # Arrange
+    api = FakeBotAPI()
+    driver = LoadTestDriver(bot=None, dp=None, api=api, seed=1)
+    keyboard = {"inline_keyboard": [[
+        {"text": "Да", "callback_data": "answer:1:yes"},
+        {"text": "Нет", "callback_data": "answer:1:no"},
+    ]]}
+
+    # Act
+    api.record_message(api.make_message({"chat_id": 7, "text": "Вопрос"}), {"reply_markup": json.dumps(keyboard)})
+    buttons = driver.inline_buttons(7)
+    api.record_message(api.make_message({"chat_id": 7, "text": "Опиши подробнее"}), {})
+
+    # Assert
+    assert buttons == ["answer:1:yes", "answer:1:no"]
+    assert driver.inline_buttons(7) == []
+    assert driver.inline_buttons(8) == []
+    assert api.last_message(7)["text"] == "Опиши подробнее"
@@ -0,0 +1,39 @@
+import pytest
+from datetime import date
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from employees.models import Employee
+from questions.models import PollQuestion, PollStatus, PollType
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_plan_missed_days_range_counts_polls_per_day():
+    # Arrange
+    PollQuestion.objects.filter(poll_type__in=[PollType.FEEDBACK, PollType.INTERMEDIATE_FEEDBACK]).delete()
+    for days_after_hire in (1, 3):
+        PollQuestion.objects.create(
+            title=f"{days_after_hire}-й день", message="Тест",
+            days_after_hire=days_after_hire, poll_type=PollType.FEEDBACK,
+        )
+    Employee.objects.bulk_create([
+        Employee(
+            user=User.objects.create_user(email="missed@example.com", password="testpass"),
+            full_name="Test Employee", telegram_nickname="testemployee", date_of_employment=date(2024, 3, 1),
+        ),
+    ])
+    dry_run_output, output = StringIO(), StringIO()
+
+    # Act
+    call_command("plan_missed_days", "--from", "2024-03-01", "--to", "2024-03-07", "--dry-run", stdout=dry_run_output)
+    created_on_dry_run = PollStatus.objects.count()
+    call_command("plan_missed_days", "--from", "2024-03-01", "--to", "2024-03-07", stdout=output)
+
+    # Assert
+    assert created_on_dry_run == 0
+    assert "2024-03-02: 1" in dry_run_output.getvalue()
+    assert "2024-03-04: 1" in dry_run_output.getvalue()
+    assert PollStatus.objects.count() == 2
@@ -132,11 +132,9 @@ class EmployeeAdmin(admin.ModelAdmin):
     restore_employees.short_description = "Восстановить выбранных сотрудников"
 
     def update_employees_onboarding_status(self, request, queryset):
-        updated_count = 0
-        for obj in queryset:
-            obj: Employee
-            obj.update_onboarding_status()
-            updated_count += 1
+        employees_ids = list(queryset.values_list("id", flat=True))
+        Employee.objects.update_onboarding_statuses(employees_ids)
+        updated_count = len(employees_ids)
         self.message_user(
             request, f"Обновлено {updated_count} сотрудников.", messages.SUCCESS
         )
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import connection, models
 from django.db.models import (
     Case,
     When,
@@ -6,10 +6,30 @@ from django.db.models import (
     IntegerField,
     QuerySet,
 )
-from questions.models import PollStatus
-from typing import Optional
+from django.utils import timezone
+from questions.models import PollQuestion, PollStatus, PollType
+from datetime import date
+from typing import Dict, Iterable, Optional
 from core.managers import SoftDeleteManager
 
+# Приоритет статусов опросов при выборе статуса онбординга сотрудника
+ONBOARDING_STATUS_PRIORITY = (
+    PollStatus.Status.EXPIRED,
+    PollStatus.Status.IN_FROZEN,
+    PollStatus.Status.IN_PROGRESS,
+    PollStatus.Status.NOT_STARTED,
+)
+
+
+def onboarding_status_key(status: str, date_planned_at: date) -> tuple:
+    """
+    Ключ сортировки опросов при выборе статуса онбординга (меньше - важнее),
+    тот же порядок, что и в EmployeeManager.update_onboarding_statuses
+    """
+    if status in ONBOARDING_STATUS_PRIORITY:
+        return ONBOARDING_STATUS_PRIORITY.index(status), date_planned_at.toordinal()
+    return len(ONBOARDING_STATUS_PRIORITY), -date_planned_at.toordinal()
+
 
 class EmployeeManager(SoftDeleteManager):
     def curators_for_projects(self, projects_ids: QuerySet) -> QuerySet:
@@ -74,3 +94,122 @@ class EmployeeManager(SoftDeleteManager):
         )
 
         return queryset
+
+    def update_onboarding_statuses(self, employees_ids: Iterable[int] | None = None) -> Dict[int, int | None]:
+        """
+        Пересчитывает статус онбординга сотрудников одним SQL-запросом.
+        Для каждого сотрудника выбирается личный опрос (без промежуточной обратной связи), запланированный
+        не позже сегодняшнего дня: первый по дате среди просроченных, затем замороженных, начатых и неначатых,
+        если все пройдены - последний по дате. Записываются только изменившиеся значения, сигналы save() не вызываются.
+
+        Args:
+            employees_ids (Optional[Iterable[int]]): идентификаторы сотрудников, если не переданы - все сотрудники
+        Returns:
+            Dict[int, Optional[int]]: новые значения onboarding_status_id изменившихся сотрудников
+        """
+        employee_table = self.model._meta.db_table
+        onboarding_status_column = self.model._meta.get_field("onboarding_status").column
+        params = []
+        if employees_ids is None:
+            targets = f"(SELECT id AS employee_id FROM {employee_table}) AS targets"
+        else:
+            employees_ids = list(employees_ids)
+            if not employees_ids:
+                return {}
+            targets = f"(VALUES {', '.join(['(%s)'] * len(employees_ids))}) AS targets (employee_id)"
+            params.extend(employees_ids)
+
+        priority = " ".join(
+            f"WHEN '{status}' THEN {number}" for number, status in enumerate(ONBOARDING_STATUS_PRIORITY)
+        )
+        params.extend([PollType.INTERMEDIATE_FEEDBACK, timezone.now().date(), PollStatus.Status.COMPLETED])
+        sql = f"""
+            UPDATE {employee_table} AS employee
+            SET {onboarding_status_column} = chosen.poll_status_id
+            FROM {targets}
+            LEFT JOIN (
+                SELECT DISTINCT ON (poll_status.employee_id)
+                    poll_status.employee_id, poll_status.id AS poll_status_id
+                FROM {PollStatus._meta.db_table} AS poll_status
+                JOIN {PollQuestion._meta.db_table} AS poll ON poll.id = poll_status.poll_id
+                WHERE poll_status.target_employee_id IS NULL
+                  AND NOT poll_status.is_archived
+                  AND poll_status.is_visible
+                  AND poll.poll_type <> %s
+                  AND poll_status.date_planned_at <= %s
+                ORDER BY
+                    poll_status.employee_id,
+                    CASE poll_status.status {priority} ELSE {len(ONBOARDING_STATUS_PRIORITY)} END,
+                    CASE WHEN poll_status.status = %s
+                        THEN NULL ELSE poll_status.date_planned_at END ASC NULLS LAST,
+                    poll_status.date_planned_at DESC,
+                    poll_status.id
+            ) AS chosen ON chosen.employee_id = targets.employee_id
+            WHERE employee.id = targets.employee_id
+              AND employee.{onboarding_status_column} IS DISTINCT FROM chosen.poll_status_id
+            RETURNING employee.id, employee.{onboarding_status_column}
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return dict(cursor.fetchall())
+
+    def sync_onboarding_status(self, **poll_status_lookup):
+        """
+        Инкрементально обновляет статус онбординга сотрудника после смены статуса или даты его личного опроса.
+        Опрос, который важнее текущего статуса онбординга, занимает его место одним UPDATE (сигналы не вызываются).
+        Если изменился сам текущий статус онбординга или он устарел, статус сотрудника пересчитывается полностью.
+        Расхождения, которые не ловятся событиями (наступление даты опроса), исправляет задача reconcile_onboarding_statuses
+
+        Args:
+            poll_status_lookup: условия поиска PollStatus (id или employee_id, poll_id, target_employee_id)
+        """
+        if poll_status_lookup.get("target_employee_id") is not None:
+            return
+        row = (
+            PollStatus.all_objects.filter(**poll_status_lookup)
+            .values_list(
+                "id",
+                "employee_id",
+                "target_employee_id",
+                "is_archived",
+                "is_visible",
+                "status",
+                "date_planned_at",
+                "poll__poll_type",
+                "employee__onboarding_status_id",
+                "employee__onboarding_status__status",
+                "employee__onboarding_status__date_planned_at",
+                "employee__onboarding_status__is_archived",
+                "employee__onboarding_status__is_visible",
+            )
+            .first()
+        )
+        if row is None:
+            return
+        (
+            poll_status_id, employee_id, target_employee_id, is_archived, is_visible, status, date_planned_at, poll_type,
+            current_id, current_status, current_date_planned_at, current_is_archived, current_is_visible,
+        ) = row
+        if target_employee_id is not None:
+            return
+
+        today = timezone.now().date()
+        if current_id == poll_status_id or current_is_archived or current_is_visible is False or (
+                current_id is not None and (current_date_planned_at is None or current_date_planned_at > today)
+        ):
+            self.update_onboarding_statuses([employee_id])
+            return
+
+        is_relevant = (
+            not is_archived
+            and is_visible
+            and poll_type != PollType.INTERMEDIATE_FEEDBACK
+            and date_planned_at is not None
+            and date_planned_at <= today
+        )
+        if is_relevant and (
+                current_id is None
+                or onboarding_status_key(status, date_planned_at)
+                < onboarding_status_key(current_status, current_date_planned_at)
+        ):
+            self.model.all_objects.filter(id=employee_id).update(onboarding_status_id=poll_status_id)
@@ -1,8 +1,7 @@
 from django.conf import settings
 from django.db import models
-from django.utils import timezone
 from core.models import SoftDeleteModel
-from questions.models import PollStatus, PollType
+from questions.models import PollStatus
 from employees.managers import EmployeeManager
 
 
@@ -157,40 +156,11 @@ class Employee(SoftDeleteModel):
 
         Вычисляется по личным опросам сотрудника. Сортируется по дате прохождения и статусу прохождения.
         Необходимо вызывать при создании, обновлении, удалении PollStatus, привязанного к сотруднику (личный опрос).
+        Пересчет выполняется одним запросом (EmployeeManager.update_onboarding_statuses)
         """
-        
-        poll_statuses = (
-            PollStatus.objects.exclude(poll__poll_type=PollType.INTERMEDIATE_FEEDBACK)
-            .filter(
-                employee=self,
-                target_employee__isnull=True,
-                date_planned_at__lte=timezone.now(),
-            )
-            .order_by("date_planned_at")
-        )
-        
-        if not poll_statuses:
-            self.onboarding_status = None
-            self.save()
-            return None
-
-        priority_statuses = [
-            PollStatus.Status.EXPIRED,
-            PollStatus.Status.IN_FROZEN,
-            PollStatus.Status.IN_PROGRESS,
-            PollStatus.Status.NOT_STARTED,
-        ]
-
-        for status in priority_statuses:
-            poll_status: PollStatus = poll_statuses.filter(status=status).first()
-            if poll_status:
-                self.onboarding_status = poll_status
-                self.save()
-                return None
-
-        last_poll_status: PollStatus = poll_statuses.last()
-        self.onboarding_status = last_poll_status
-        self.save()
+        updated = Employee.objects.update_onboarding_statuses([self.id])
+        if self.id in updated:
+            self.onboarding_status_id = updated[self.id]
 
     objects: EmployeeManager = EmployeeManager()
 
@@ -1,11 +1,12 @@
 from datetime import date
 
 from django.db.models import Q
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 
 from comments.models import Comment
 from core.management.bot.texts import texts_add_new_employee_for_curator
+from core.management.bot.utils.identity import invalidate_employee_identity
 from employees.models import Employee, CuratorEmployees
 from employees.tasks import send_planned_meeting_notification, send_notification_curator
 from questions.models import PollStatus, PollQuestion, PollType, UserType
@@ -127,6 +128,19 @@ def handle_curator_employee_assignment(sender, instance: CuratorEmployees, creat
             send_notification_curator.delay(curator.telegram_user_id, text_message)
 
 
+@receiver(post_delete, sender=CuratorEmployees)
+def handle_curator_employee_unassignment(sender, instance: CuratorEmployees, **kwargs):
+    """
+    Сигнал, который срабатывает при откреплении куратора от сотрудника.
+    Удаляет заранее созданные и еще не открытые опросы куратора по этому сотруднику
+    """
+    PollStatus.all_objects.filter(
+        employee_id=instance.curator_id,
+        target_employee_id=instance.employee_id,
+        is_visible=False,
+    ).delete()
+
+
 @receiver(pre_save, sender=Employee)
 def send_meeting_notification(sender, instance: Employee, **kwargs):
     """
@@ -146,3 +160,11 @@ def send_meeting_notification(sender, instance: Employee, **kwargs):
                     )
         except Employee.DoesNotExist:
             pass
+
+
+@receiver([post_save, post_delete], sender=Employee)
+def invalidate_employee_identity_cache(sender, instance: Employee, **kwargs):
+    """
+    Сбрасывает закэшированные в боте данные сотрудника (роль, статус риска, ФИО, ник)
+    """
+    invalidate_employee_identity(instance)
@@ -1,9 +1,9 @@
-import asyncio
 from datetime import datetime
 
 from celery import shared_task
 from django.utils import timezone
 
+from core.async_runtime import run_async
 from employees.models import Employee
 from employees.utils import send_message_to_employee_tg, send_message_to_curator_tg
 
@@ -18,15 +18,22 @@ def send_planned_meeting_notification(telegram_user_id, datetime_meeting, resche
     else:
         message = f'Вам назначена встреча по итогам испытательного срока на {formatted_datetime}'
 
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(send_message_to_employee_tg(chat_id=telegram_user_id, message=message))
+    run_async(send_message_to_employee_tg(chat_id=telegram_user_id, message=message))
 
 
 @shared_task
 def send_notification_curator(telegram_user_id, message):
     """Таска для отправки памятки куратора в бота"""
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(send_message_to_curator_tg(chat_id=telegram_user_id, message=message))
+    run_async(send_message_to_curator_tg(chat_id=telegram_user_id, message=message))
+
+
+@shared_task
+def reconcile_onboarding_statuses():
+    """
+    Таска для сверки статусов онбординга: исправляет расхождения инкрементального обновления
+    и учитывает опросы, дата которых наступила
+    """
+    return len(Employee.objects.update_onboarding_statuses())
 
 
 @shared_task
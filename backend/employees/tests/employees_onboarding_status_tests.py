@@ -0,0 +1,80 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from employees.models import Employee
+from questions.models import PollQuestion, PollStatus
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_update_onboarding_statuses_picks_status_by_priority_in_one_query():
+    # Arrange
+    today = timezone.now().date()
+    polls = [PollQuestion.objects.create(title=f"Опрос {number}", message="Тест") for number in range(4)]
+    employees = [
+        Employee.objects.create(
+            user=User.objects.create_user(email=f"status{number}@example.com", password="testpass"),
+            full_name=f"Test Employee {number}",
+            telegram_nickname=f"testemployee{number}",
+        )
+        for number in range(3)
+    ]
+    # первый сотрудник: просроченный опрос важнее начатого
+    PollStatus.objects.create(employee=employees[0], poll=polls[0], status=PollStatus.Status.IN_PROGRESS,
+                              date_planned_at=today - timedelta(days=2))
+    expired = PollStatus.objects.create(employee=employees[0], poll=polls[1], status=PollStatus.Status.EXPIRED,
+                                        date_planned_at=today - timedelta(days=1))
+    # будущий опрос не учитывается
+    PollStatus.objects.create(employee=employees[0], poll=polls[2], status=PollStatus.Status.EXPIRED,
+                              date_planned_at=today + timedelta(days=1))
+    # второй сотрудник: все пройдены - берется последний по дате
+    PollStatus.objects.create(employee=employees[1], poll=polls[0], status=PollStatus.Status.COMPLETED,
+                              date_planned_at=today - timedelta(days=3))
+    last_completed = PollStatus.objects.create(employee=employees[1], poll=polls[1],
+                                               status=PollStatus.Status.COMPLETED, date_planned_at=today)
+
+    # Act
+    with CaptureQueriesContext(connection) as context:
+        Employee.objects.update_onboarding_statuses([employee.id for employee in employees])
+
+    # Assert
+    assert len(context.captured_queries) == 1
+    assert [Employee.objects.get(id=employee.id).onboarding_status_id for employee in employees] == [
+        expired.id, last_completed.id, None
+    ]
+
+
+@pytest.mark.django_db
+def test_sync_onboarding_status_moves_pointer_incrementally():
+    # Arrange
+    today = timezone.now().date()
+    polls = [PollQuestion.objects.create(title=f"Опрос {number}", message="Тест") for number in range(2)]
+    employee = Employee.objects.create(
+        user=User.objects.create_user(email="sync@example.com", password="testpass"),
+        full_name="Test Employee",
+        telegram_nickname="testemployee",
+    )
+    first = PollStatus.objects.create(employee=employee, poll=polls[0], status=PollStatus.Status.NOT_STARTED,
+                                      date_planned_at=today - timedelta(days=1))
+    second = PollStatus.objects.create(employee=employee, poll=polls[1], status=PollStatus.Status.NOT_STARTED,
+                                       date_planned_at=today)
+    Employee.objects.update_onboarding_statuses([employee.id])
+
+    # Act
+    PollStatus.objects.filter(id=second.id).update(status=PollStatus.Status.IN_PROGRESS)
+    Employee.objects.sync_onboarding_status(id=second.id)
+    employee.refresh_from_db()
+    after_start = employee.onboarding_status_id
+
+    PollStatus.objects.filter(id=second.id).update(status=PollStatus.Status.COMPLETED)
+    Employee.objects.sync_onboarding_status(id=second.id)
+    employee.refresh_from_db()
+
+    # Assert
+    assert after_start == second.id
+    assert employee.onboarding_status_id == first.id
@@ -1,7 +1,7 @@
 from typing import List
 
 from core.management.bot.create_bot import bot
-from core.management.bot.utils.functions import get_book
+from core.management.bot.utils.media import send_book
 from employees.models import Employee, CuratorEmployees
 from projects.models import ProjectAssignment
 
@@ -26,10 +26,10 @@ async def send_message_to_curator_tg(chat_id: int | None, message: str):
     """
     if chat_id:
         try:
-            await bot.send_document(
+            await send_book(
                 chat_id,
+                'core/management/bot/files/book_curator.pdf',
                 caption=message,
-                document=get_book('core/management/bot/files/book_curator.pdf')
             )
         except Exception:
             pass
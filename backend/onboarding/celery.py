@@ -1,7 +1,28 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "onboarding.settings")
 app = Celery("onboarding")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def start_worker_async_runtime(**kwargs):
+    """
+    Запускает в процессе-воркере цикл событий, общий для всех задач, которые обращаются к Telegram
+    """
+    from core.async_runtime import start_async_runtime
+
+    start_async_runtime()
+
+
+@worker_process_shutdown.connect
+def stop_worker_async_runtime(**kwargs):
+    """
+    Закрывает сессию бота и останавливает цикл событий при завершении процесса-воркера
+    """
+    from core.async_runtime import stop_async_runtime
+
+    stop_async_runtime()
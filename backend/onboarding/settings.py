@@ -234,6 +234,10 @@ CELERY_BEAT_SCHEDULE = {
         "task": "questions.tasks.admin_notification_employees_expired_polls",
         "schedule": crontab(minute="0", hour="13,20"),
     },
+    "schedule_reconcile_onboarding_statuses": {
+        "task": "employees.tasks.reconcile_onboarding_statuses",
+        "schedule": crontab(minute="30", hour="0"),
+    },
     "schedule_update_status_employee": {
         "task": "employees.tasks.update_status_employee",
         "schedule": crontab(minute="50", hour="23"),
@@ -241,13 +245,27 @@ CELERY_BEAT_SCHEDULE = {
     "schedule_cancel_frozen_pollstatuses": {
         "task": "questions.tasks.cancel_frozen_pollstatuses",
         "schedule": crontab(minute='0', hour="0")
-    }
+    },
+    "schedule_flush_admin_alerts": {
+        "task": "core.tasks.flush_admin_alerts",
+        "schedule": crontab(minute="*/5"),
+    },
 }
 
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 REDIS_URL = os.getenv("REDIS_URL")
 
+# Заранее создавать весь календарь опросов сотрудника (будущие опросы скрыты до наступления даты)
+POLL_CALENDAR_MATERIALIZE = os.getenv("POLL_CALENDAR_MATERIALIZE", "false").lower() == "true"
+# На сколько дней вперед создается календарь опросов
+POLL_CALENDAR_HORIZON_DAYS = int(os.getenv("POLL_CALENDAR_HORIZON_DAYS", 400))
+
+# Окно (в секундах), за которое уведомления админам о "плохих" ответах собираются в дайджест
+ADMIN_ALERTS_WINDOW = int(os.getenv("ADMIN_ALERTS_WINDOW", 60))
+# Количество уведомлений, при котором дайджест отправляется, не дожидаясь конца окна
+ADMIN_ALERTS_MAX_BATCH = int(os.getenv("ADMIN_ALERTS_MAX_BATCH", 30))
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -9,6 +9,7 @@ from .models import (
     PollStatus,
 )
 from .tasks import run_poll_task
+from core.management.bot.utils.poll_graph import invalidate_poll_graph
 
 
 class QuestionConditionInline(admin.TabularInline):
@@ -29,14 +30,22 @@ class QuestionAdmin(admin.ModelAdmin):
 
     def set_show_true(self, request, queryset):
         queryset.update(show=True)
+        self.invalidate_polls(queryset)
 
     set_show_true.short_description = "Установить show = True для выбранных вопросов"
 
     def set_show_false(self, request, queryset):
         queryset.update(show=False)
+        self.invalidate_polls(queryset)
 
     set_show_false.short_description = "Установить show = False для выбранных вопросов"
 
+    @staticmethod
+    def invalidate_polls(queryset):
+        """update() не вызывает сигналы, поэтому сбрасываем графы опросов бота вручную"""
+        for poll_id in set(queryset.values_list("poll_id", flat=True)):
+            invalidate_poll_graph(poll_id)
+
     fieldsets = (
         (
             None,
@@ -249,6 +258,7 @@ class PollStatusAdmin(admin.ModelAdmin):
         "employee",
         "target_employee",
         "created_by_admin",
+        "is_visible",
     )
     search_fields = ("employee__full_name", "poll__title")
     readonly_fields = ("id",)
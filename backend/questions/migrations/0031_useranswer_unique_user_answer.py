@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+def delete_duplicate_user_answers(apps, schema_editor):
+    """
+    Удаляет дубли ответов сотрудника на один вопрос о себе (target_employee = null),
+    которые пропускало прежнее ограничение unique_together. Остается последний ответ
+    """
+    UserAnswer = apps.get_model('questions', 'UserAnswer')
+    latest_ids = (
+        UserAnswer.objects.filter(target_employee__isnull=True)
+        .values('employee_id', 'question_id')
+        .annotate(latest_id=models.Max('id'), count=models.Count('id'))
+        .filter(count__gt=1)
+    )
+    for row in latest_ids:
+        UserAnswer.objects.filter(
+            employee_id=row['employee_id'],
+            question_id=row['question_id'],
+            target_employee__isnull=True,
+            id__lt=row['latest_id'],
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0030_alter_question_category_analytics'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_user_answers, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='useranswer',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='useranswer',
+            constraint=models.UniqueConstraint(fields=('employee', 'target_employee', 'question'), name='unique_user_answer', nulls_distinct=False),
+        ),
+    ]
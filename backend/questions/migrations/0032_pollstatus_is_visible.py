@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0031_useranswer_unique_user_answer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pollstatus',
+            name='is_visible',
+            field=models.BooleanField(default=True, verbose_name='Виден сотруднику'),
+        ),
+        migrations.AddIndex(
+            model_name='pollstatus',
+            index=models.Index(condition=models.Q(('is_visible', False)), fields=['date_planned_at'], name='pollstatus_invisible_date_idx'),
+        ),
+    ]
@@ -300,7 +300,14 @@ class UserAnswer(models.Model):
         return f'Ответ пользователя {self.employee.full_name} на вопрос "{self.question.text}"'
 
     class Meta:
-        unique_together = ("employee", "target_employee", "question")
+        constraints = [
+            # null в target_employee (ответ о себе) тоже считается совпадением, иначе upsert ответа не сработает
+            models.UniqueConstraint(
+                fields=("employee", "target_employee", "question"),
+                name="unique_user_answer",
+                nulls_distinct=False,
+            )
+        ]
         verbose_name = "Ответ"
         verbose_name_plural = "Ответы"
 
@@ -320,6 +327,7 @@ class PollStatus(models.Model):
         time_planned_at (CharField): Время когда пользователю будет предложен опрос
         created_by_admin (BooleanField): Флаг создания опроса администратором
         is_archived (BooleanField): Флаг архивации опроса
+        is_visible (BooleanField): Флаг видимости опроса (ложь для заранее запланированных опросов, дата которых не наступила)
     """
 
     class Status(models.TextChoices):
@@ -376,11 +384,20 @@ class PollStatus(models.Model):
 
     is_archived = models.BooleanField(default=False, verbose_name="В архиве")
 
+    is_visible = models.BooleanField(default=True, verbose_name="Виден сотруднику")
+
     objects = ActivePollStatusManager()
     all_objects = models.Manager()
 
     class Meta:
         unique_together = ("employee", "poll", "target_employee")
+        indexes = [
+            models.Index(
+                fields=["date_planned_at"],
+                name="pollstatus_invisible_date_idx",
+                condition=models.Q(is_visible=False),
+            ),
+        ]
         verbose_name = "Статус опроса"
         verbose_name_plural = "Статусы опросов"
 
@@ -0,0 +1,234 @@
+import logging
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from aiogram.types import ReplyKeyboardRemove
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+
+from core.async_runtime import run_async
+from core.broadcast import BroadcastMessage, broadcast
+from core.management.bot.keyboards import (
+    interview_continue_keyboard,
+    interview_pre_get_list_keyboard,
+    interview_start_keyboard,
+)
+from employees.models import Employee
+from projects.models import Project
+from .models import PollStatus, PollQuestion, PollType, Question, TimeOfDay, UserAnswer
+from .utils import add_label_content_type_poll, generate_message_count_polls
+
+logger = logging.getLogger(__name__)
+
+# Сколько замороженных опросов сбрасывается в одной транзакции
+FROZEN_RESET_CHUNK_SIZE = 1000
+
+
+def expire_poll_statuses(poll_type: PollType, today: date) -> Set[int]:
+    """
+    Помечает просроченными неначатые опросы типа poll_type, запланированные до сегодняшнего дня.
+    Одним UPDATE ... RETURNING возвращает сотрудников, у которых просрочился личный опрос
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {PollStatus._meta.db_table} AS poll_status
+            SET status = %s
+            FROM {PollQuestion._meta.db_table} AS poll
+            WHERE poll_status.poll_id = poll.id
+              AND poll.poll_type = %s
+              AND poll_status.status = %s
+              AND poll_status.date_planned_at < %s
+              AND NOT poll_status.is_archived
+              AND poll_status.is_visible
+            RETURNING poll_status.employee_id, poll_status.target_employee_id
+            """,
+            [PollStatus.Status.EXPIRED, poll_type, PollStatus.Status.NOT_STARTED, today],
+        )
+        return {employee_id for employee_id, target_employee_id in cursor.fetchall() if target_employee_id is None}
+
+
+def get_project_names(polls: Iterable[PollQuestion]) -> Dict[int, str]:
+    """
+    Возвращает названия проектов, к которым привязаны опросы, одним запросом
+    """
+    project_content_type = ContentType.objects.get_for_model(Project)
+    projects_ids = {poll.object_id for poll in polls if poll.content_type_id == project_content_type.id}
+    if not projects_ids:
+        return {}
+    return dict(Project.all_objects.filter(id__in=projects_ids).values_list("id", "name"))
+
+
+def build_poll_notifications(
+        poll_statuses: List[PollStatus], poll_type: PollType, time_of_day: TimeOfDay | None = None
+) -> List[BroadcastMessage]:
+    """
+    Группирует запланированные опросы по получателям: один опрос - приглашение пройти его,
+    несколько - сообщение о количестве непройденных опросов со списком
+    """
+    project_names = get_project_names(poll_status.poll for poll_status in poll_statuses)
+    label_time_of_day = "(конец дня)" if time_of_day == TimeOfDay.EVENING else ""
+
+    polls = defaultdict(list)
+    for poll_status in poll_statuses:
+        poll: PollQuestion = poll_status.poll
+        target_employee: Employee | None = poll_status.target_employee
+        message = poll.message.format(target_employee.full_name) if target_employee else poll.message
+        message = add_label_content_type_poll(poll, message, project_names)
+        polls[poll_status.employee.telegram_user_id].append(
+            (message, interview_start_keyboard(poll.id, target_employee))
+        )
+
+    messages = []
+    for telegram_user_id, polls_employee in polls.items():
+        message, reply_markup = polls_employee[0]
+        if len(polls_employee) > 1:
+            message = generate_message_count_polls(len(polls_employee), poll_type, label_time_of_day)
+            reply_markup = interview_pre_get_list_keyboard(poll_type)
+        messages.append(BroadcastMessage(telegram_user_id, message, reply_markup))
+    return messages
+
+
+def send_broadcast(messages: List[BroadcastMessage]) -> dict:
+    return run_async(broadcast(messages)).to_dict()
+
+
+def dispatch_poll_notifications(
+        poll_type: PollType,
+        today: date,
+        time_of_day: TimeOfDay | None = None,
+        sender: Callable[[List[BroadcastMessage]], dict] = send_broadcast,
+) -> dict:
+    """
+    Рассылка предложений пройти запланированные опросы типа poll_type (и времени суток time_of_day, если передано):
+    просроченные опросы помечаются одним запросом, статус онбординга пересчитывается только у затронутых сотрудников,
+    получатели группируются и передаются отправителю
+    """
+    expired_employees_ids = expire_poll_statuses(poll_type, today)
+    if expired_employees_ids:
+        Employee.objects.update_onboarding_statuses(expired_employees_ids)
+
+    poll_statuses = (
+        PollStatus.objects.select_related("poll", "employee", "target_employee")
+        .filter(
+            date_planned_at__lte=today,
+            status=PollStatus.Status.NOT_STARTED,
+            is_visible=True,
+            poll__poll_type=poll_type,
+            employee__telegram_user_id__isnull=False,
+        )
+        .order_by("poll__poll_number")
+    )
+    if time_of_day is not None:
+        poll_statuses = poll_statuses.filter(time_planned_at=time_of_day)
+
+    return sender(build_poll_notifications(list(poll_statuses), poll_type, time_of_day))
+
+
+def freeze_stale_poll_statuses(threshold: datetime) -> List[Tuple[int, int, int | None, int | None]]:
+    """
+    Одним UPDATE ... RETURNING замораживает начатые опросы, к которым не возвращались с threshold.
+    Возвращает (employee_id, poll_id, target_employee_id, telegram_user_id) замороженных опросов
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {PollStatus._meta.db_table} AS poll_status
+            SET status = %s
+            FROM {Employee._meta.db_table} AS employee
+            WHERE poll_status.employee_id = employee.id
+              AND poll_status.status = %s
+              AND poll_status.started_at < %s
+              AND NOT poll_status.is_archived
+              AND poll_status.is_visible
+            RETURNING poll_status.employee_id, poll_status.poll_id,
+                      poll_status.target_employee_id, employee.telegram_user_id
+            """,
+            [PollStatus.Status.IN_FROZEN, PollStatus.Status.IN_PROGRESS, threshold],
+        )
+        return cursor.fetchall()
+
+
+def build_continue_messages(frozen: Iterable[Tuple[int, int, int | None, int | None]]) -> List[BroadcastMessage]:
+    """
+    Два сообщения в чат на каждый замороженный опрос: вопрос "на связи?" и кнопка продолжить опрос
+    """
+    messages = []
+    for _, poll_id, target_employee_id, telegram_user_id in frozen:
+        if not telegram_user_id:
+            continue
+        target_employee = Employee(id=target_employee_id) if target_employee_id else None
+        messages.append(BroadcastMessage(telegram_user_id, "Ты на связи?", ReplyKeyboardRemove()))
+        messages.append(BroadcastMessage(
+            telegram_user_id,
+            "Пожалуйста, заверши опрос до конца",
+            interview_continue_keyboard(poll_id, target_employee),
+        ))
+    return messages
+
+
+def ping_frozen_poll_statuses(
+        threshold: datetime,
+        sender: Callable[[List[BroadcastMessage]], dict] = send_broadcast,
+) -> dict:
+    """
+    Замораживает все зависшие опросы одним запросом, пересчитывает статус онбординга их владельцев
+    и рассылает предложения продолжить опрос с соблюдением лимитов Telegram
+    """
+    frozen = freeze_stale_poll_statuses(threshold)
+    employees_ids = {employee_id for employee_id, _, target_employee_id, _ in frozen if target_employee_id is None}
+    if employees_ids:
+        Employee.objects.update_onboarding_statuses(employees_ids)
+
+    started = time.perf_counter()
+    sent = sender(build_continue_messages(frozen)) if frozen else {}
+    metrics = {"frozen": len(frozen), "send_elapsed": round(time.perf_counter() - started, 3), **sent}
+    logger.info("Заморожено зависших опросов: %s", metrics)
+    return metrics
+
+
+def reset_frozen_poll_statuses(chunk_size: int = FROZEN_RESET_CHUNK_SIZE) -> dict:
+    """
+    Сбрасывает замороженные опросы в "не начат" пачками по chunk_size: в каждой транзакции
+    одним DELETE удаляются ответы на все опросы пачки, одним UPDATE сбрасываются их статусы,
+    затем одним запросом пересчитывается статус онбординга затронутых сотрудников
+    """
+    started = time.perf_counter()
+    metrics = {"reset": 0, "answers_deleted": 0}
+    while True:
+        with transaction.atomic():
+            frozen = list(
+                PollStatus.objects.select_for_update(skip_locked=True)
+                .filter(status=PollStatus.Status.IN_FROZEN)
+                .order_by("id")
+                .values_list("id", "employee_id", "target_employee_id")[:chunk_size]
+            )
+            if not frozen:
+                break
+            poll_statuses_ids = [poll_status_id for poll_status_id, _, _ in frozen]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    DELETE FROM {UserAnswer._meta.db_table} AS answer
+                    USING {Question._meta.db_table} AS question, {PollStatus._meta.db_table} AS poll_status
+                    WHERE answer.question_id = question.id
+                      AND question.poll_id = poll_status.poll_id
+                      AND answer.employee_id = poll_status.employee_id
+                      AND answer.target_employee_id IS NOT DISTINCT FROM poll_status.target_employee_id
+                      AND poll_status.id = ANY(%s)
+                    """,
+                    [poll_statuses_ids],
+                )
+                metrics["answers_deleted"] += cursor.rowcount
+            metrics["reset"] += PollStatus.all_objects.filter(id__in=poll_statuses_ids).update(
+                status=PollStatus.Status.NOT_STARTED
+            )
+            employees_ids = {employee_id for _, employee_id, target_employee_id in frozen if target_employee_id is None}
+            if employees_ids:
+                Employee.objects.update_onboarding_statuses(employees_ids)
+
+    metrics["elapsed"] = round(time.perf_counter() - started, 3)
+    logger.info("Сброшено замороженных опросов: %s", metrics)
+    return metrics
@@ -0,0 +1,350 @@
+import itertools
+import logging
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from employees.models import Employee, CuratorEmployees
+from projects.models import Project, ProjectAssignment
+from .models import PollQuestion, PollStatus, PollType, UserType
+
+logger = logging.getLogger(__name__)
+
+# Размер пачки при вставке запланированных опросов
+PLANNING_CHUNK_SIZE = 1000
+FEEDBACK_POLL_TYPES = (PollType.FEEDBACK, PollType.INTERMEDIATE_FEEDBACK)
+# Ключ кэша, защищающий от повторной постановки достройки календаря опросов
+MATERIALIZE_POLL_CALENDAR_KEY = "materialize_poll_calendar"
+
+
+class PollTemplate(NamedTuple):
+    id: int
+    days_after_hire: int
+    time_of_day: str
+
+
+class PlannedPoll(NamedTuple):
+    """
+    Опрос, который должен появиться у сотрудника
+    """
+    employee_id: int
+    poll_id: int
+    target_employee_id: int | None
+    date_planned_at: date
+    time_planned_at: str
+
+
+class PlanningResult:
+    """
+    Итоги планирования опросов.
+
+    Attributes:
+        planned (int): Количество созданных (при dry_run - подлежащих созданию) опросов.
+        skipped (int): Количество опросов, которые уже существовали.
+        elapsed (float): Длительность планирования в секундах.
+        by_day (Counter): Количество созданных опросов по датам.
+    """
+
+    def __init__(self):
+        self.planned = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+        self.by_day: Counter = Counter()
+
+    def to_dict(self) -> dict:
+        return {
+            "planned": self.planned,
+            "skipped": self.skipped,
+            "elapsed": round(self.elapsed, 3),
+        }
+
+    def __repr__(self):
+        return f"<PlanningResult {self.to_dict()}>"
+
+
+def planning_range(today: date) -> Tuple[date, date]:
+    """
+    Интервал планирования от сегодняшнего дня: только сегодня
+    или, если календарь опросов создается заранее (POLL_CALENDAR_MATERIALIZE), весь горизонт планирования
+    """
+    if settings.POLL_CALENDAR_MATERIALIZE:
+        return today, today + timedelta(days=settings.POLL_CALENDAR_HORIZON_DAYS)
+    return today, today
+
+
+def due_polls(
+        templates: Iterable[PollTemplate], base_date: date, date_from: date, date_to: date
+) -> Iterator[Tuple[PollTemplate, date]]:
+    """
+    Возвращает шаблоны, дата опроса по которым (base_date + days_after_hire) попадает в интервал
+    """
+    for template in templates:
+        date_planned_at = base_date + timedelta(days=template.days_after_hire)
+        if date_from <= date_planned_at <= date_to:
+            yield template, date_planned_at
+
+
+def load_onboarding_templates() -> Dict[Tuple[int, str], List[PollTemplate]]:
+    """
+    Загружает шаблоны опросов адаптации на проектах: (project_id, intended_for) -> шаблоны
+    """
+    templates = defaultdict(list)
+    polls = PollQuestion.objects.filter(
+        poll_type=PollType.ONBOARDING,
+        content_type=ContentType.objects.get_for_model(Project),
+    ).values_list("id", "object_id", "intended_for", "days_after_hire", "time_of_day")
+    for poll_id, project_id, intended_for, days_after_hire, time_of_day in polls:
+        templates[(project_id, intended_for)].append(PollTemplate(poll_id, days_after_hire, time_of_day))
+    return templates
+
+
+def load_feedback_templates(intended_for: UserType) -> List[PollTemplate]:
+    """
+    Загружает шаблоны опросов обратной связи
+    """
+    return [
+        PollTemplate(*poll)
+        for poll in PollQuestion.objects.filter(
+            intended_for=intended_for, poll_type__in=FEEDBACK_POLL_TYPES
+        ).values_list("id", "days_after_hire", "time_of_day")
+    ]
+
+
+def load_project_curators(employees_ids: Set[int]) -> Dict[Tuple[int, int], List[int]]:
+    """
+    Загружает кураторов сотрудников, назначенных на те же проекты: (employee_id, project_id) -> кураторы
+    """
+    employees_by_curator = defaultdict(list)
+    for curator_id, employee_id in CuratorEmployees.objects.filter(
+            employee_id__in=employees_ids
+    ).values_list("curator_id", "employee_id"):
+        employees_by_curator[curator_id].append(employee_id)
+
+    project_curators = defaultdict(list)
+    for curator_id, project_id in ProjectAssignment.objects.filter(
+            employee_id__in=employees_by_curator
+    ).values_list("employee_id", "project_id"):
+        for employee_id in employees_by_curator[curator_id]:
+            project_curators[(employee_id, project_id)].append(curator_id)
+    return project_curators
+
+
+def onboarding_candidates(
+        date_from: date, date_to: date, assignments: QuerySet | None = None
+) -> Iterator[PlannedPoll]:
+    """
+    Опросы адаптации на проекте для сотрудников (и кураторов, работающих как сотрудники)
+    и опросы их кураторов, назначенных на тот же проект. Дата считается от даты выхода на проект
+    """
+    assignments = ProjectAssignment.objects.all() if assignments is None else assignments
+    rows = list(
+        assignments.filter(date_of_employment__isnull=False)
+        .filter(
+            Q(employee__role=Employee.RoleChoices.EMPLOYEE)
+            | Q(
+                employee__role=Employee.RoleChoices.CURATOR,
+                employee__is_curator_employee=True,
+                employee__is_deleted=False,
+            )
+        )
+        .values_list("employee_id", "project_id", "date_of_employment")
+    )
+    if not rows:
+        return
+    templates = load_onboarding_templates()
+    project_curators = load_project_curators({employee_id for employee_id, _, _ in rows})
+
+    for employee_id, project_id, date_of_employment in rows:
+        for template, date_planned_at in due_polls(
+                templates.get((project_id, UserType.EMPLOYEE), ()), date_of_employment, date_from, date_to
+        ):
+            yield PlannedPoll(employee_id, template.id, None, date_planned_at, template.time_of_day)
+        curator_templates = templates.get((project_id, UserType.CURATOR), ())
+        for curator_id in project_curators.get((employee_id, project_id), ()):
+            for template, date_planned_at in due_polls(curator_templates, date_of_employment, date_from, date_to):
+                yield PlannedPoll(curator_id, template.id, employee_id, date_planned_at, template.time_of_day)
+
+
+def feedback_candidates(
+        date_from: date, date_to: date, employees: QuerySet | None = None
+) -> Iterator[PlannedPoll]:
+    """
+    Опросы обратной связи для сотрудников и кураторов, работающих как сотрудники.
+    Дата считается от даты устройства сотрудника
+    """
+    if employees is None:
+        employees = Employee.objects.filter(
+            Q(role=Employee.RoleChoices.EMPLOYEE)
+            | Q(role=Employee.RoleChoices.CURATOR, is_curator_employee=True)
+        )
+    rows = list(employees.filter(date_of_employment__isnull=False).values_list("id", "date_of_employment"))
+    if not rows:
+        return
+    templates = load_feedback_templates(UserType.EMPLOYEE)
+
+    for employee_id, date_of_employment in rows:
+        for template, date_planned_at in due_polls(templates, date_of_employment, date_from, date_to):
+            yield PlannedPoll(employee_id, template.id, None, date_planned_at, template.time_of_day)
+
+
+def curator_candidates(
+        date_from: date, date_to: date, curator_employees: QuerySet | None = None
+) -> Iterator[PlannedPoll]:
+    """
+    Опросы кураторов по их сотрудникам: обратная связь (от даты устройства сотрудника)
+    и адаптация на проектах, на которые назначены и куратор, и сотрудник (от даты выхода сотрудника на проект)
+    """
+    curator_employees = CuratorEmployees.objects.all() if curator_employees is None else curator_employees
+    links = list(curator_employees.values_list("curator_id", "employee_id", "employee__date_of_employment"))
+    if not links:
+        return
+    feedback_templates = load_feedback_templates(UserType.CURATOR)
+    onboarding_templates = load_onboarding_templates()
+
+    employees_ids = {employee_id for _, employee_id, _ in links}
+    curators_ids = {curator_id for curator_id, _, _ in links}
+    employee_assignments = defaultdict(list)
+    for employee_id, project_id, date_of_employment in ProjectAssignment.objects.filter(
+            employee_id__in=employees_ids, date_of_employment__isnull=False
+    ).values_list("employee_id", "project_id", "date_of_employment"):
+        employee_assignments[employee_id].append((project_id, date_of_employment))
+    curator_projects = set(
+        ProjectAssignment.objects.filter(employee_id__in=curators_ids).values_list("employee_id", "project_id")
+    )
+
+    for curator_id, employee_id, date_of_employment in links:
+        if date_of_employment is not None:
+            for template, date_planned_at in due_polls(feedback_templates, date_of_employment, date_from, date_to):
+                yield PlannedPoll(curator_id, template.id, employee_id, date_planned_at, template.time_of_day)
+        for project_id, project_date_of_employment in employee_assignments.get(employee_id, ()):
+            if (curator_id, project_id) not in curator_projects:
+                continue
+            for template, date_planned_at in due_polls(
+                    onboarding_templates.get((project_id, UserType.CURATOR), ()),
+                    project_date_of_employment,
+                    date_from,
+                    date_to,
+            ):
+                yield PlannedPoll(curator_id, template.id, employee_id, date_planned_at, template.time_of_day)
+
+
+def load_existing_keys(planned: Dict[Tuple[int, int, int | None], PlannedPoll]) -> Set[Tuple[int, int, int | None]]:
+    """
+    Возвращает ключи (employee_id, poll_id, target_employee_id) уже существующих опросов.
+    Для личных опросов target_employee_id = NULL, а NULL не участвует в unique_together
+    (employee, poll, target_employee), поэтому существующие опросы отсекаются до вставки,
+    а не только через ignore_conflicts. Заодно так считается skipped и в БД не уходят лишние строки
+    """
+    if not planned:
+        return set()
+    return set(
+        PollStatus.all_objects.filter(
+            poll_id__in={key[1] for key in planned},
+            employee_id__in={key[0] for key in planned},
+        ).values_list("employee_id", "poll_id", "target_employee_id")
+    )
+
+
+def save_planned_polls(
+        candidates: Iterable[PlannedPoll], dry_run: bool = False, chunk_size: int = PLANNING_CHUNK_SIZE
+) -> PlanningResult:
+    """
+    Вставляет недостающие опросы пачками через bulk_create(ignore_conflicts=True)
+    и один раз пересчитывает статус онбординга сотрудников, у которых появились личные опросы.
+    Опросы, дата которых еще не наступила, создаются скрытыми (is_visible = False)
+    """
+    started = time.perf_counter()
+    result = PlanningResult()
+    today = timezone.now().date()
+
+    planned = {}
+    for candidate in candidates:
+        planned.setdefault((candidate.employee_id, candidate.poll_id, candidate.target_employee_id), candidate)
+    existing = load_existing_keys(planned)
+    new_polls = [candidate for key, candidate in planned.items() if key not in existing]
+    result.planned = len(new_polls)
+    result.skipped = len(planned) - len(new_polls)
+    result.by_day = Counter(candidate.date_planned_at for candidate in new_polls)
+
+    if not dry_run and new_polls:
+        for start in range(0, len(new_polls), chunk_size):
+            PollStatus.objects.bulk_create(
+                [
+                    PollStatus(
+                        employee_id=candidate.employee_id,
+                        poll_id=candidate.poll_id,
+                        target_employee_id=candidate.target_employee_id,
+                        date_planned_at=candidate.date_planned_at,
+                        time_planned_at=candidate.time_planned_at,
+                        is_visible=candidate.date_planned_at <= today,
+                    )
+                    for candidate in new_polls[start:start + chunk_size]
+                ],
+                ignore_conflicts=True,
+            )
+        employees_ids = {
+            candidate.employee_id
+            for candidate in new_polls
+            if candidate.target_employee_id is None and candidate.date_planned_at <= today
+        }
+        if employees_ids:
+            Employee.objects.update_onboarding_statuses(employees_ids)
+
+    result.elapsed = time.perf_counter() - started
+    logger.info("Планирование опросов%s: %s", " (dry run)" if dry_run else "", result.to_dict())
+    return result
+
+
+def plan_poll_statuses(date_from: date, date_to: date | None = None, dry_run: bool = False) -> PlanningResult:
+    """
+    Планирует все опросы (адаптация, обратная связь, опросы кураторов), выпадающие на интервал дат, одним проходом
+    """
+    date_to = date_from if date_to is None else date_to
+    return save_planned_polls(
+        itertools.chain(
+            onboarding_candidates(date_from, date_to),
+            feedback_candidates(date_from, date_to),
+            curator_candidates(date_from, date_to),
+        ),
+        dry_run=dry_run,
+    )
+
+
+def reveal_planned_polls(today: date) -> int:
+    """
+    Открывает заранее созданные опросы, дата которых наступила, одним UPDATE по частичному индексу
+    и пересчитывает статус онбординга затронутых сотрудников
+    """
+    planned_polls = PollStatus.objects.filter(is_visible=False, date_planned_at__lte=today)
+    employees_ids = set(
+        planned_polls.filter(target_employee__isnull=True).values_list("employee_id", flat=True)
+    )
+    revealed = planned_polls.update(is_visible=True)
+    if employees_ids:
+        Employee.objects.update_onboarding_statuses(employees_ids)
+    logger.info("Открыто заранее созданных опросов: %s", revealed)
+    return revealed
+
+
+def drop_hidden_project_polls(assignment_id: int):
+    """
+    Удаляет еще скрытые опросы адаптации проекта, созданные от прежней даты выхода сотрудника на проект
+    (личные опросы сотрудника и опросы его кураторов по нему)
+    """
+    assignment = ProjectAssignment.objects.filter(id=assignment_id).values_list("employee_id", "project_id").first()
+    if assignment is None:
+        return
+    employee_id, project_id = assignment
+    PollStatus.all_objects.filter(
+        Q(employee_id=employee_id, target_employee__isnull=True) | Q(target_employee_id=employee_id),
+        is_visible=False,
+        poll__poll_type=PollType.ONBOARDING,
+        poll__content_type=ContentType.objects.get_for_model(Project),
+        poll__object_id=project_id,
+    ).delete()
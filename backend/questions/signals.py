@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.management.bot.keyboards import invalidate_answers_keyboards
+from core.management.bot.utils.poll_chain import invalidate_poll_chain
+from core.management.bot.utils.poll_graph import invalidate_poll_graph
+from questions.models import PollQuestion, Question, QuestionCondition, KeyboardType
+from questions.planning import MATERIALIZE_POLL_CALENDAR_KEY
+from questions.tasks import materialize_poll_calendar
+
+
+@receiver([post_save, post_delete], sender=PollQuestion)
+def invalidate_poll_graph_on_poll_change(sender, instance: PollQuestion, **kwargs):
+    """
+    Сбрасывает скомпилированный граф опроса и индекс предыдущих опросов в боте при изменении шаблона опроса
+    """
+    invalidate_poll_graph(instance.id)
+    invalidate_poll_chain()
+
+
+@receiver(post_save, sender=PollQuestion)
+def materialize_poll_calendar_on_poll_create(sender, instance: PollQuestion, created: bool, **kwargs):
+    """
+    Достраивает заранее созданный календарь опросов после добавления шаблона опроса.
+    Пачка новых шаблонов приводит к одной достройке
+    """
+    if not created or not settings.POLL_CALENDAR_MATERIALIZE:
+        return
+    if cache.add(MATERIALIZE_POLL_CALENDAR_KEY, 1, timeout=60):
+        transaction.on_commit(lambda: materialize_poll_calendar.apply_async(countdown=30))
+
+
+@receiver([post_save, post_delete], sender=Question)
+def invalidate_poll_graph_on_question_change(sender, instance: Question, **kwargs):
+    """
+    Сбрасывает скомпилированный граф опроса в боте при изменении вопроса
+    """
+    invalidate_poll_graph(instance.poll_id)
+
+
+@receiver([post_save, post_delete], sender=QuestionCondition)
+def invalidate_poll_graph_on_condition_change(sender, instance: QuestionCondition, **kwargs):
+    """
+    Сбрасывает скомпилированные графы опросов в боте при изменении условия перехода между вопросами
+    """
+    polls_ids = Question.objects.filter(
+        id__in=[instance.question_id, instance.previous_question_id]
+    ).values_list("poll_id", flat=True)
+    for poll_id in set(polls_ids):
+        invalidate_poll_graph(poll_id)
+
+
+@receiver([post_save, post_delete], sender=KeyboardType)
+def invalidate_answers_keyboards_on_change(sender, instance: KeyboardType, **kwargs):
+    """
+    Сбрасывает закэшированные клавиатуры ответов в боте при изменении клавиатуры
+    """
+    invalidate_answers_keyboards()
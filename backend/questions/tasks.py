@@ -1,34 +1,45 @@
-import asyncio
 from collections import defaultdict
 from datetime import date, timedelta
 from typing import List
 
 from celery import shared_task
-from django.contrib.contenttypes.models import ContentType
+from django.conf import settings
 from django.core.cache import cache
-from django.db import transaction
 from django.utils import timezone
 
 from core.management.bot.keyboards import (
     interview_start_keyboard,
-    interview_continue_keyboard,
     interview_pre_get_list_keyboard,
 )
 from core.management.bot.utils.functions import (
-    update_poll_status_object,
     generate_employees_expired_polls_message_for_admins,
     get_admin_telegram_user_id_employee,
 )
+from core.async_runtime import run_async
+from core.broadcast import BroadcastMessage, broadcast
 from core.tasks import notification_admins
 from employees.models import Employee, CuratorEmployees
-from employees.utils import get_curators_as_employees
-from projects.models import Project, ProjectAssignment
-from .models import PollStatus, PollQuestion, PollType, UserType, TimeOfDay, UserAnswer
+from projects.models import ProjectAssignment
+from .notifications import (
+    dispatch_poll_notifications,
+    ping_frozen_poll_statuses,
+    reset_frozen_poll_statuses,
+)
+from .planning import (
+    MATERIALIZE_POLL_CALENDAR_KEY,
+    curator_candidates,
+    drop_hidden_project_polls,
+    feedback_candidates,
+    onboarding_candidates,
+    plan_poll_statuses,
+    planning_range,
+    reveal_planned_polls,
+    save_planned_polls,
+)
+from .models import PollStatus, PollQuestion, PollType, UserType, TimeOfDay
 from .utils import (
     send_notificate,
-    ping_user_to_continue,
     create_similar_poll,
-    generate_message_count_polls,
     add_label_content_type_poll,
 )
 
@@ -38,70 +49,7 @@ def schedule_notification_poll_onboarding(time_of_day):
     """
     Функция, выполняющаяся в Celery для отправки предложения пройти опрос адаптации на проекте
     """
-    today = timezone.now().date()
-
-    # помечаем просроченными старые опросы
-
-    expired_polls = PollStatus.objects.filter(
-        date_planned_at__lt=today,
-        status=PollStatus.Status.NOT_STARTED,
-        poll__poll_type=PollType.ONBOARDING,
-    )
-
-    expired_polls.update(status=PollStatus.Status.EXPIRED)
-    # обновление статусов опросов сотрудников
-    [
-        poll.employee.update_onboarding_status()
-        for poll in expired_polls
-        if poll.target_employee is None
-    ]
-
-    polls_planned = (
-        PollStatus.objects.select_related("poll", "employee", "target_employee")
-        .filter(
-            date_planned_at__lte=today,
-            time_planned_at=time_of_day,
-            status__in=[PollStatus.Status.NOT_STARTED],
-            poll__poll_type=PollType.ONBOARDING,
-        )
-        .order_by("poll__poll_number")
-    )
-
-    label_time_of_day = "" if time_of_day == TimeOfDay.MORNING else "(конец дня)"
-
-    polls = defaultdict(list)
-
-    for poll_planned in polls_planned:
-        employee: Employee = poll_planned.employee
-        poll: PollQuestion = poll_planned.poll
-        target_employee: Employee | None = poll_planned.target_employee
-
-        message = (
-            poll.message.format(target_employee.full_name)
-            if target_employee
-            else poll.message
-        )
-        reply_markup = interview_start_keyboard(poll.id, target_employee)
-
-        message = add_label_content_type_poll(poll, message)
-
-        if employee.telegram_user_id:
-            polls[employee.telegram_user_id].append((message, reply_markup))
-
-    loop = asyncio.get_event_loop()
-
-    for telegram_user_id in polls:
-        polls_employee = polls[telegram_user_id]
-        count_polls = len(polls_employee)
-        message, reply_markup = polls_employee[0]
-        if count_polls > 1:
-            message = generate_message_count_polls(
-                count_polls, PollType.ONBOARDING, label_time_of_day
-            )
-            reply_markup = interview_pre_get_list_keyboard(PollType.ONBOARDING)
-        loop.run_until_complete(
-            send_notificate(telegram_user_id, message, reply_markup)
-        )
+    return dispatch_poll_notifications(PollType.ONBOARDING, timezone.now().date(), time_of_day)
 
 
 @shared_task
@@ -109,28 +57,7 @@ def check_poll_status():
     """
     Функция, выполняющаяся в Celery для отправки предложения продолжить опрос
     """
-    threshold = timezone.now() - timezone.timedelta(minutes=30)
-    stuck_users = PollStatus.objects.filter(
-        status=PollStatus.Status.IN_PROGRESS, started_at__lt=threshold
-    )
-    for record in stuck_users:
-        employee: Employee = record.employee
-        poll: PollQuestion = record.poll
-        target_employee: Employee | None = record.target_employee
-
-        update_poll_status_object(
-            poll.id,
-            employee.telegram_user_id,
-            PollStatus.Status.IN_FROZEN,
-            target_employee.id if target_employee else 0,
-        )
-
-        reply_markup = interview_continue_keyboard(poll.id, target_employee)
-
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(
-            ping_user_to_continue(employee.telegram_user_id, reply_markup)
-        )
+    return ping_frozen_poll_statuses(timezone.now() - timezone.timedelta(minutes=30))
 
 
 @shared_task
@@ -138,63 +65,7 @@ def schedule_notification_poll_offboarding():
     """
     Функция, выполняющаяся в Celery для отправки предложения пройти оффбординг
     """
-    today = timezone.now().date()
-
-    expired_polls = PollStatus.objects.filter(
-        date_planned_at__lt=today,
-        status=PollStatus.Status.NOT_STARTED,
-        poll__poll_type=PollType.OFFBOARDING,
-    )
-
-    expired_polls.update(status=PollStatus.Status.EXPIRED)
-    # обновление статусов опросов сотрудников
-    [
-        poll.employee.update_onboarding_status()
-        for poll in expired_polls
-        if poll.target_employee is None
-    ]
-
-    polls_planned = (
-        PollStatus.objects.select_related("poll", "employee", "target_employee")
-        .filter(
-            date_planned_at__lte=today,
-            status__in=[PollStatus.Status.NOT_STARTED],
-            poll__poll_type=PollType.OFFBOARDING,
-        )
-        .order_by("poll__poll_number")
-    )
-
-    polls = defaultdict(list)
-
-    for poll_planned in polls_planned:
-        employee: Employee = poll_planned.employee
-        poll: PollQuestion = poll_planned.poll
-        target_employee: Employee | None = poll_planned.target_employee
-
-        message = (
-            poll.message.format(target_employee.full_name)
-            if target_employee
-            else poll.message
-        )
-        reply_markup = interview_start_keyboard(poll.id, target_employee)
-
-        message = add_label_content_type_poll(poll, message)
-
-        if employee.telegram_user_id:
-            polls[employee.telegram_user_id].append((message, reply_markup))
-
-    loop = asyncio.get_event_loop()
-
-    for telegram_user_id in polls:
-        polls_employee = polls[telegram_user_id]
-        count_polls = len(polls_employee)
-        message, reply_markup = polls_employee[0]
-        if count_polls > 1:
-            message = generate_message_count_polls(count_polls, PollType.OFFBOARDING)
-            reply_markup = interview_pre_get_list_keyboard(PollType.OFFBOARDING)
-        loop.run_until_complete(
-            send_notificate(telegram_user_id, message, reply_markup)
-        )
+    return dispatch_poll_notifications(PollType.OFFBOARDING, timezone.now().date())
 
 
 @shared_task
@@ -202,70 +73,7 @@ def schedule_notification_poll_feedback(time_of_day, poll_type=PollType.FEEDBACK
     """
     Функция, выполняющаяся в Celery для отправки предложения пройти опрос обратной связи
     """
-    today = timezone.now().date()
-
-    expired_polls = PollStatus.objects.filter(
-        date_planned_at__lt=today,
-        status=PollStatus.Status.NOT_STARTED,
-        poll__poll_type=poll_type,
-    )
-
-    expired_polls.update(status=PollStatus.Status.EXPIRED)
-    # обновление статусов опросов сотрудников
-    [
-        poll.employee.update_onboarding_status()
-        for poll in expired_polls
-        if poll.target_employee is None
-    ]
-
-    polls_planned = (
-        PollStatus.objects.select_related("poll", "employee", "target_employee")
-        .filter(
-            date_planned_at__lte=today,
-            time_planned_at=time_of_day,
-            status__in=[PollStatus.Status.NOT_STARTED],
-            poll__poll_type=poll_type,
-        )
-        .order_by("poll__poll_number")
-    )
-
-    label_time_of_day = "" if time_of_day == TimeOfDay.MORNING else "(конец дня)"
-
-    polls = defaultdict(list)
-
-    for poll_planned in polls_planned:
-        employee: Employee = poll_planned.employee
-        poll: PollQuestion = poll_planned.poll
-        target_employee: Employee | None = poll_planned.target_employee
-
-        message = (
-            poll.message.format(target_employee.full_name)
-            if target_employee
-            else poll.message
-        )
-        reply_markup = interview_start_keyboard(poll.id, target_employee)
-
-        message = add_label_content_type_poll(poll, message)
-
-        if employee.telegram_user_id:
-            polls[employee.telegram_user_id].append((message, reply_markup))
-
-    loop = asyncio.get_event_loop()
-
-    for telegram_user_id in polls:
-        polls_employee = polls[telegram_user_id]
-        count_polls = len(polls_employee)
-        message, reply_markup = polls_employee[0]
-        if count_polls > 1:
-            message = generate_message_count_polls(
-                count_polls,
-                poll_type,
-                label_time_of_day,
-            )
-            reply_markup = interview_pre_get_list_keyboard(poll_type)
-        loop.run_until_complete(
-            send_notificate(telegram_user_id, message, reply_markup)
-        )
+    return dispatch_poll_notifications(poll_type, timezone.now().date(), time_of_day)
 
 
 @shared_task
@@ -284,10 +92,7 @@ def run_poll_task(poll_status_id):
             poll_status.poll.id, poll_status.target_employee
         )
 
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(
-            send_notificate(chat_id=chat_id, message=message, reply_markup=reply_markup)
-        )
+        run_async(send_notificate(chat_id=chat_id, message=message, reply_markup=reply_markup))
 
 
 @shared_task
@@ -295,41 +100,9 @@ def schedule_create_pollstatus_feedback(instance_pk=None, today=None):
     """
     Выполняет создание опросов обратной связи для сотрудников и сотрудников-кураторов
     """
-
     today = date.today() if today is None else date.fromisoformat(today)
-
-    if not instance_pk:
-        employees = Employee.objects.filter(role=Employee.RoleChoices.EMPLOYEE)
-        employees = list(employees) + get_curators_as_employees()
-    else:
-        employees = [Employee.all_objects.get(id=instance_pk)]
-    polls = PollQuestion.objects.filter(
-        intended_for=UserType.EMPLOYEE,
-        poll_type__in=[PollType.FEEDBACK, PollType.INTERMEDIATE_FEEDBACK],
-    ).order_by("days_after_hire")
-
-    for employee in employees:
-        employee: Employee
-        days_passed = (today - employee.date_of_employment).days
-        for poll in polls:
-            if poll.days_after_hire >= days_passed:
-                time_planned_at = poll.time_of_day
-                date_planned_at = employee.date_of_employment + timezone.timedelta(
-                    days=poll.days_after_hire
-                )
-                if date_planned_at > today:
-                    break
-                if date_planned_at == today:
-                    PollStatus.objects.get_or_create(
-                        employee=employee,
-                        poll=poll,
-                        target_employee=None,
-                        defaults={
-                            "time_planned_at": time_planned_at,
-                            "date_planned_at": date_planned_at,
-                        },
-                    )
-        employee.update_onboarding_status()
+    employees = Employee.all_objects.filter(id=instance_pk) if instance_pk else None
+    return save_planned_polls(feedback_candidates(*planning_range(today), employees)).to_dict()
 
 
 @shared_task
@@ -337,83 +110,9 @@ def schedule_create_pollstatus_for_curator(instance_pk=None, today=None):
     """
     Выполняет создание опросов для кураторов
     """
-
     today = date.today() if today is None else date.fromisoformat(today)
-
-    content_type = ContentType.objects.get_for_model(Project)
-
-    if not instance_pk:
-        curator_employees = CuratorEmployees.objects.select_related(
-            "curator", "employee"
-        ).all()
-    else:
-        curator_employees = [CuratorEmployees.objects.get(id=instance_pk)]
-
-    feedback_polls = PollQuestion.objects.filter(
-        intended_for=UserType.CURATOR,
-        poll_type__in=[PollType.FEEDBACK, PollType.INTERMEDIATE_FEEDBACK],
-    ).order_by("days_after_hire")
-
-    for instance in curator_employees:
-        curator = instance.curator
-        employee = instance.employee
-
-        days_passed = (today - employee.date_of_employment).days
-
-        for poll in feedback_polls:
-            if poll.days_after_hire >= days_passed:
-                time_planned_at = poll.time_of_day
-                date_planned_at = employee.date_of_employment + timezone.timedelta(
-                    days=poll.days_after_hire
-                )
-                if date_planned_at > today:
-                    break
-                if date_planned_at == today:
-                    PollStatus.objects.get_or_create(
-                        employee=curator,
-                        poll=poll,
-                        target_employee=employee,
-                        defaults={
-                            "time_planned_at": time_planned_at,
-                            "date_planned_at": date_planned_at,
-                        },
-                    )
-
-        project_assignments = ProjectAssignment.objects.filter(
-            employee=employee
-        ).select_related("project")
-
-        for project_assignment in project_assignments:
-            if ProjectAssignment.objects.filter(
-                employee=curator, project=project_assignment.project
-            ).exists():
-
-                onboarding_polls = PollQuestion.objects.filter(
-                    intended_for=UserType.CURATOR,
-                    poll_type=PollType.ONBOARDING,
-                    content_type=content_type,
-                    object_id=project_assignment.project.id,
-                    days_after_hire__gte=days_passed,
-                ).order_by("days_after_hire")
-
-                for poll in onboarding_polls:
-                    time_planned_at = poll.time_of_day
-                    date_planned_at = (
-                        project_assignment.date_of_employment
-                        + timezone.timedelta(days=poll.days_after_hire)
-                    )
-                    if date_planned_at > today:
-                        break
-                    if date_planned_at == today:
-                        PollStatus.objects.get_or_create(
-                            employee=curator,
-                            poll=poll,
-                            target_employee=employee,
-                            defaults={
-                                "time_planned_at": time_planned_at,
-                                "date_planned_at": date_planned_at,
-                            },
-                        )
+    curator_employees = CuratorEmployees.objects.filter(id=instance_pk) if instance_pk else None
+    return save_planned_polls(curator_candidates(*planning_range(today), curator_employees)).to_dict()
 
 
 @shared_task
@@ -421,93 +120,14 @@ def schedule_create_pollstatus_onboarding(instance_pk=None, today=None):
     """
     Выполняет создание опросов адаптации для сотрудника и его кураторов
     """
-
     today = date.today() if today is None else date.fromisoformat(today)
-
-    content_type = ContentType.objects.get_for_model(Project)
-    curators_as_employees = get_curators_as_employees()
-
+    assignments = None
     if instance_pk:
-        current_project_assignments = [ProjectAssignment.objects.get(id=instance_pk)]
-    else:
-        current_project_assignments = ProjectAssignment.objects.select_related(
-            "project", "employee"
-        ).all()
-
-    for current_project_assignment in current_project_assignments:
-        if current_project_assignment.date_of_employment is not None and (
-            current_project_assignment.employee.role == Employee.RoleChoices.EMPLOYEE
-            or current_project_assignment.employee in curators_as_employees
-        ):
-
-            project = current_project_assignment.project
-            employee = current_project_assignment.employee
-
-            days_passed = (today - current_project_assignment.date_of_employment).days
-
-            polls = PollQuestion.objects.filter(
-                intended_for=UserType.EMPLOYEE,
-                poll_type=PollType.ONBOARDING,
-                content_type=content_type,
-                object_id=project.id,
-                days_after_hire__gte=days_passed,
-            ).order_by("days_after_hire")
-
-            for poll in polls:
-                time_planned_at = poll.time_of_day
-                date_planned_at = (
-                    current_project_assignment.date_of_employment
-                    + timezone.timedelta(days=poll.days_after_hire)
-                )
-                if date_planned_at > today:
-                    break
-                if date_planned_at == today:
-                    PollStatus.objects.get_or_create(
-                        employee=employee,
-                        poll=poll,
-                        target_employee=None,
-                        defaults={
-                            "time_planned_at": time_planned_at,
-                            "date_planned_at": date_planned_at,
-                        },
-                    )
-            employee.update_onboarding_status()
-
-            all_employee_curators = CuratorEmployees.objects.filter(
-                employee=employee
-            ).values_list("curator_id", flat=True)
-
-            project_curators = ProjectAssignment.objects.filter(
-                project=project, employee__in=all_employee_curators
-            ).values_list("employee_id", flat=True)
-
-            polls_curator = PollQuestion.objects.filter(
-                intended_for=UserType.CURATOR,
-                poll_type=PollType.ONBOARDING,
-                content_type=content_type,
-                object_id=project.id,
-                days_after_hire__gte=days_passed,
-            ).order_by("days_after_hire")
-
-            for curator_id in project_curators:
-                for poll in polls_curator:
-                    time_planned_at = poll.time_of_day
-                    date_planned_at = (
-                        current_project_assignment.date_of_employment
-                        + timezone.timedelta(days=poll.days_after_hire)
-                    )
-                    if date_planned_at > today:
-                        break
-                    if date_planned_at == today:
-                        PollStatus.objects.get_or_create(
-                            employee_id=curator_id,
-                            poll=poll,
-                            target_employee=employee,
-                            defaults={
-                                "time_planned_at": time_planned_at,
-                                "date_planned_at": date_planned_at,
-                            },
-                        )
+        assignments = ProjectAssignment.objects.filter(id=instance_pk)
+        if settings.POLL_CALENDAR_MATERIALIZE:
+            # дата выхода на проект могла измениться - календарь проекта строится заново
+            drop_hidden_project_polls(instance_pk)
+    return save_planned_polls(onboarding_candidates(*planning_range(today), assignments)).to_dict()
 
 
 @shared_task
@@ -614,8 +234,7 @@ def schedule_ping_notification_polls():
         if employee.telegram_user_id:
             polls[employee.telegram_user_id] += 1
 
-    loop = asyncio.get_event_loop()
-
+    messages = []
     for telegram_user_id in polls:
         count_polls = polls[telegram_user_id]
         if count_polls == 1:
@@ -625,16 +244,38 @@ def schedule_ping_notification_polls():
         else:
             count_text = f"{count_polls} просроченных опросов"
         message = f"У вас есть {count_text}"
-        loop.run_until_complete(
-            send_notificate(
-                telegram_user_id, message, interview_pre_get_list_keyboard()
-            )
+        messages.append(
+            BroadcastMessage(telegram_user_id, message, interview_pre_get_list_keyboard())
         )
 
+    return run_async(broadcast(messages)).to_dict()
+
+
+@shared_task
+def schedule_plan_pollstatuses(day):
+    """Таска, планирующая все опросы на день одним проходом"""
+    return plan_poll_statuses(date.fromisoformat(day)).to_dict()
+
+
+@shared_task
+def materialize_poll_calendar():
+    """Таска, достраивающая календарь опросов всех сотрудников на горизонт планирования (например, после добавления шаблонов)"""
+    cache.delete(MATERIALIZE_POLL_CALENDAR_KEY)
+    return plan_poll_statuses(*planning_range(date.today())).to_dict()
+
 
 @shared_task
 def schedule_create_pollstatuses(list_days: None | List[date] = None):
-    """Таска создающая опросы на сегодняшний и предыдущий день"""
+    """
+    Таска создающая опросы на сегодняшний и предыдущий день.
+    Если календарь опросов создается заранее, достраивает его на день, входящий в горизонт планирования
+    (и предыдущий, как и без календаря), и открывает опросы, дата которых наступила
+    """
+    if not list_days and settings.POLL_CALENDAR_MATERIALIZE:
+        today = date.today()
+        horizon = today + timedelta(days=settings.POLL_CALENDAR_HORIZON_DAYS)
+        plan_poll_statuses(horizon - timedelta(days=1), horizon)
+        return reveal_planned_polls(today)
     if not list_days:
         today = date.today()
         yesterday = today - timedelta(days=1)
@@ -646,11 +287,7 @@ def schedule_create_pollstatuses(list_days: None | List[date] = None):
         if not cache.get(task_name):
             eta = timezone.now().replace(hour=1, minute=0, second=0, microsecond=0)
 
-            schedule_create_pollstatus_onboarding.apply_async(args=[None, day], eta=eta)
-            schedule_create_pollstatus_feedback.apply_async(args=[None, day], eta=eta)
-            schedule_create_pollstatus_for_curator.apply_async(
-                args=[None, day], eta=eta
-            )
+            schedule_plan_pollstatuses.apply_async(args=[day], eta=eta)
 
             cache.set(task_name, "scheduled", timeout=timedelta(days=5).total_seconds())
         else:
@@ -660,23 +297,4 @@ def schedule_create_pollstatuses(list_days: None | List[date] = None):
 @shared_task
 def cancel_frozen_pollstatuses():
     """Если опрос остался замороженным, то сбрасываем его состояние в не начат, и удаляем уже данные ответы"""
-
-    pollstatuses_frozen = PollStatus.objects.filter(
-        status=PollStatus.Status.IN_FROZEN
-    ).select_related("employee", "target_employee", "poll")
-
-    for poll_status in pollstatuses_frozen:
-        with transaction.atomic():
-
-            user_answers = UserAnswer.objects.filter(
-                question__poll=poll_status.poll,
-                employee=poll_status.employee,
-                target_employee=poll_status.target_employee,
-            )
-            if user_answers:
-                user_answers.delete()
-
-            poll_status.status = PollStatus.Status.NOT_STARTED
-            poll_status.save()
-            employee: Employee = poll_status.employee
-            employee.update_onboarding_status()
+    return reset_frozen_poll_statuses()
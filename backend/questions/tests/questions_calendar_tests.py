@@ -0,0 +1,110 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from employees.models import CuratorEmployees, Employee
+from questions.models import PollQuestion, PollStatus, PollType
+from questions.planning import plan_poll_statuses, planning_range, reveal_planned_polls
+from questions.tasks import schedule_create_pollstatuses
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_materialized_calendar_hides_future_polls_until_their_day(settings):
+    # Arrange
+    settings.POLL_CALENDAR_MATERIALIZE = True
+    settings.POLL_CALENDAR_HORIZON_DAYS = 30
+    today = timezone.now().date()
+    PollQuestion.objects.filter(poll_type__in=[PollType.FEEDBACK, PollType.INTERMEDIATE_FEEDBACK]).delete()
+    today_poll = PollQuestion.objects.create(
+        title="Сегодня", message="Тест", days_after_hire=0, poll_type=PollType.FEEDBACK
+    )
+    future_poll = PollQuestion.objects.create(
+        title="Через неделю", message="Тест", days_after_hire=7, poll_type=PollType.FEEDBACK
+    )
+    PollQuestion.objects.create(
+        title="Через год", message="Тест", days_after_hire=365, poll_type=PollType.FEEDBACK
+    )
+    employee, = Employee.objects.bulk_create([
+        Employee(
+            user=User.objects.create_user(email="calendar@example.com", password="testpass"),
+            full_name="Test Employee", telegram_nickname="testemployee", date_of_employment=today,
+        ),
+    ])
+
+    # Act
+    result = plan_poll_statuses(*planning_range(today))
+    visible_polls = PollStatus.objects.filter(is_visible=True).values_list("poll_id", flat=True)
+    visible_before = set(visible_polls)
+    revealed = reveal_planned_polls(today + timedelta(days=7))
+
+    # Assert
+    employee.refresh_from_db()
+    assert result.planned == 2
+    assert visible_before == {today_poll.id}
+    assert revealed == 1
+    assert set(visible_polls) == {today_poll.id, future_poll.id}
+    assert employee.onboarding_status.poll_id == today_poll.id
+
+
+@pytest.mark.django_db
+def test_hidden_polls_of_archived_or_unassigned_employees_are_not_revealed():
+    # Arrange
+    today = timezone.now().date()
+    polls = [PollQuestion.objects.create(title=f"Опрос {number}", message="Тест") for number in range(2)]
+    employee, curator = Employee.objects.bulk_create([
+        Employee(
+            user=User.objects.create_user(email="hidden@example.com", password="testpass"),
+            full_name="Test Employee", telegram_nickname="testemployee",
+        ),
+        Employee(
+            user=User.objects.create_user(email="hiddencurator@example.com", password="testpass"),
+            full_name="Test Curator", telegram_nickname="testcurator", role=Employee.RoleChoices.CURATOR,
+        ),
+    ])
+    link, = CuratorEmployees.objects.bulk_create([CuratorEmployees(curator=curator, employee=employee)])
+    archived, curator_poll = PollStatus.objects.bulk_create([
+        PollStatus(employee=employee, poll=polls[0], date_planned_at=today, is_visible=False, is_archived=True),
+        PollStatus(employee=curator, poll=polls[1], target_employee=employee, date_planned_at=today, is_visible=False),
+    ])
+
+    # Act
+    link.delete()
+    revealed = reveal_planned_polls(today)
+
+    # Assert
+    archived.refresh_from_db()
+    assert revealed == 0
+    assert archived.is_visible is False
+    assert not PollStatus.all_objects.filter(id=curator_poll.id).exists()
+
+
+@pytest.mark.django_db
+def test_nightly_run_plans_the_day_entering_the_horizon(settings):
+    # Arrange
+    settings.POLL_CALENDAR_MATERIALIZE = True
+    settings.POLL_CALENDAR_HORIZON_DAYS = 30
+    today = timezone.now().date()
+    PollQuestion.objects.filter(poll_type__in=[PollType.FEEDBACK, PollType.INTERMEDIATE_FEEDBACK]).delete()
+    Employee.objects.bulk_create([
+        Employee(
+            user=User.objects.create_user(email="horizon@example.com", password="testpass"),
+            full_name="Test Employee", telegram_nickname="testemployee",
+            date_of_employment=today - timedelta(days=1),
+        ),
+    ])
+    plan_poll_statuses(*planning_range(today))
+    # шаблон добавлен в обход сигналов: его опрос выпадает ровно на границу горизонта
+    poll, = PollQuestion.objects.bulk_create([
+        PollQuestion(title="Через месяц", message="Тест", days_after_hire=31, poll_type=PollType.FEEDBACK)
+    ])
+
+    # Act
+    schedule_create_pollstatuses()
+
+    # Assert
+    planned = PollStatus.objects.get(poll=poll)
+    assert planned.date_planned_at == today + timedelta(days=30)
+    assert planned.is_visible is False
@@ -0,0 +1,45 @@
+import pytest
+from asgiref.sync import async_to_sync
+from datetime import date, timedelta
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from core.management.bot.utils.functions import cancel_interview
+from employees.models import Employee
+from questions.models import PollQuestion, PollStatus, Question, QuestionType, UserAnswer
+
+
+@pytest.mark.django_db
+def test_cancel_interview_deletes_answers_and_resets_status():
+    # Arrange
+    today = timezone.now().date()
+    poll = PollQuestion.objects.create(title="Тест тайтл", message="Тест меседж")
+    other_poll = PollQuestion.objects.create(title="Другой", message="Другой")
+    questions = [
+        Question.objects.create(poll=poll, text=f"Вопрос {number}", question_type=QuestionType.YES_NO)
+        for number in range(3)
+    ]
+    other_question = Question.objects.create(poll=other_poll, text="Вопрос", question_type=QuestionType.YES_NO)
+    user = get_user_model().objects.create_user(email="cancel@example.com", password="testpass")
+    employee = Employee.objects.create(
+        user=user,
+        full_name="Test Employee",
+        telegram_nickname="testemployee",
+        telegram_user_id=1003,
+        date_of_employment=date(2024, 1, 1),
+    )
+    for question in [*questions, other_question]:
+        UserAnswer.objects.create(employee=employee, question=question, answer="Да")
+    PollStatus.objects.create(
+        employee=employee, poll=poll, status=PollStatus.Status.IN_PROGRESS,
+        started_at=timezone.now(), date_planned_at=today - timedelta(days=1),
+    )
+
+    # Act
+    async_to_sync(cancel_interview)(poll.id, employee.id, 0)
+
+    # Assert
+    poll_status = PollStatus.objects.get(employee=employee, poll=poll)
+    assert list(UserAnswer.objects.filter(employee=employee).values_list("question_id", flat=True)) == [other_question.id]
+    assert poll_status.status == PollStatus.Status.EXPIRED
+    assert poll_status.started_at is None
@@ -0,0 +1,49 @@
+import pytest
+from django.contrib.auth import get_user_model
+from datetime import date
+
+from core.management.bot.keyboards import LIST_POLLS_PAGE_SIZE, select_list_polls_page
+from employees.models import Employee
+from questions.models import PollQuestion, PollStatus, PollType, TimeOfDay
+
+
+@pytest.mark.django_db
+def test_list_polls_keyset_pagination():
+    # Arrange
+    user = get_user_model().objects.create_user(email="testuser@example.com", password="testpass")
+    employee = Employee.objects.create(
+        user=user,
+        full_name="Test Employee",
+        telegram_nickname="testemployee",
+        date_of_employment=date(2024, 1, 1),
+    )
+    for poll_number in range(LIST_POLLS_PAGE_SIZE + 2):
+        poll = PollQuestion.objects.create(
+            title=f"Опрос {poll_number}",
+            message="Тест меседж",
+            poll_type=PollType.FEEDBACK,
+            poll_number=poll_number,
+        )
+        PollStatus.objects.create(
+            employee=employee,
+            poll=poll,
+            date_planned_at=date(2024, 1, 1),
+            time_planned_at=TimeOfDay.MORNING,
+        )
+
+    # Act
+    first_page, first_has_more = select_list_polls_page(employee.id, PollType.FEEDBACK)
+    last = first_page[-1]
+    second_page, second_has_more = select_list_polls_page(
+        employee.id, PollType.FEEDBACK, cursor=(last.poll.poll_number, last.id)
+    )
+    first = second_page[0]
+    previous_page, previous_has_more = select_list_polls_page(
+        employee.id, PollType.FEEDBACK, cursor=(first.poll.poll_number, first.id), backward=True
+    )
+
+    # Assert
+    assert len(first_page) == LIST_POLLS_PAGE_SIZE and first_has_more
+    assert [status.poll.poll_number for status in second_page] == [LIST_POLLS_PAGE_SIZE, LIST_POLLS_PAGE_SIZE + 1]
+    assert not second_has_more
+    assert previous_page == first_page and not previous_has_more
@@ -0,0 +1,127 @@
+import pytest
+from datetime import date, timedelta
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+
+from employees.models import Employee
+from projects.models import Project
+from questions.models import PollQuestion, PollStatus, PollType, Question, TimeOfDay, UserAnswer
+from questions.notifications import (
+    dispatch_poll_notifications,
+    ping_frozen_poll_statuses,
+    reset_frozen_poll_statuses,
+)
+
+
+@pytest.mark.django_db
+def test_dispatch_poll_notifications_expires_and_groups_recipients():
+    # Arrange
+    today = date(2024, 3, 1)
+    project = Project.objects.create(name="Тестовый проект")
+    PollQuestion.objects.filter(
+        content_type=ContentType.objects.get_for_model(Project), object_id=project.id
+    ).delete()
+    polls = [
+        PollQuestion.objects.create(
+            title=f"Опрос {number}",
+            message=f"Опрос {number}",
+            poll_number=number,
+            content_type=ContentType.objects.get_for_model(Project),
+            object_id=project.id,
+        )
+        for number in (1, 2, 3)
+    ]
+    employees = []
+    for number in range(2):
+        user = get_user_model().objects.create_user(email=f"dispatch{number}@example.com", password="testpass")
+        employees.append(Employee.objects.create(
+            user=user,
+            full_name=f"Test Employee {number}",
+            telegram_nickname=f"testemployee{number}",
+            telegram_user_id=2000 + number,
+            date_of_employment=today,
+        ))
+    expired = PollStatus.objects.create(
+        employee=employees[0], poll=polls[0], date_planned_at=today - timedelta(days=1),
+        time_planned_at=TimeOfDay.MORNING,
+    )
+    for poll in polls[1:]:
+        PollStatus.objects.create(
+            employee=employees[0], poll=poll, date_planned_at=today, time_planned_at=TimeOfDay.MORNING
+        )
+    PollStatus.objects.create(
+        employee=employees[1], poll=polls[1], date_planned_at=today, time_planned_at=TimeOfDay.MORNING
+    )
+    sent = []
+
+    # Act
+    dispatch_poll_notifications(PollType.ONBOARDING, today, TimeOfDay.MORNING, sender=sent.extend)
+
+    # Assert
+    expired.refresh_from_db()
+    messages = {message.chat_id: message.text for message in sent}
+    assert expired.status == PollStatus.Status.EXPIRED
+    assert len(sent) == 2
+    assert messages[2000].startswith("У вас есть непройденные опросы")
+    assert messages[2001] == "Опрос 2\n\n(Проект: Тестовый проект)"
+
+
+@pytest.mark.django_db
+def test_ping_frozen_poll_statuses_freezes_stale_polls_and_sends_two_messages():
+    # Arrange
+    now = timezone.now()
+    polls = [PollQuestion.objects.create(title=f"Опрос {number}", message="Тест") for number in range(2)]
+    user = get_user_model().objects.create_user(email="frozen@example.com", password="testpass")
+    employee = Employee.objects.create(
+        user=user, full_name="Test Employee", telegram_nickname="testemployee", telegram_user_id=3000,
+    )
+    stale = PollStatus.objects.create(
+        employee=employee, poll=polls[0], status=PollStatus.Status.IN_PROGRESS,
+        started_at=now - timedelta(hours=1), date_planned_at=now.date(),
+    )
+    fresh = PollStatus.objects.create(
+        employee=employee, poll=polls[1], status=PollStatus.Status.IN_PROGRESS,
+        started_at=now - timedelta(minutes=5), date_planned_at=now.date(),
+    )
+    sent = []
+
+    def sender(messages):
+        sent.extend(messages)
+        return {"sent": len(messages)}
+
+    # Act
+    metrics = ping_frozen_poll_statuses(now - timedelta(minutes=30), sender=sender)
+
+    # Assert
+    stale.refresh_from_db()
+    fresh.refresh_from_db()
+    assert stale.status == PollStatus.Status.IN_FROZEN
+    assert fresh.status == PollStatus.Status.IN_PROGRESS
+    assert [message.text for message in sent] == ["Ты на связи?", "Пожалуйста, заверши опрос до конца"]
+    assert {message.chat_id for message in sent} == {3000}
+    assert (metrics["frozen"], metrics["sent"]) == (1, 2)
+
+
+@pytest.mark.django_db
+def test_reset_frozen_poll_statuses_deletes_answers_of_frozen_polls_in_chunks():
+    # Arrange
+    today = timezone.now().date()
+    polls = [PollQuestion.objects.create(title=f"Опрос {number}", message="Тест") for number in range(3)]
+    questions = [Question.objects.create(poll=poll, text="Вопрос") for poll in polls]
+    user = get_user_model().objects.create_user(email="reset@example.com", password="testpass")
+    employee = Employee.objects.create(user=user, full_name="Test Employee", telegram_nickname="testemployee")
+    statuses = [PollStatus.Status.IN_FROZEN, PollStatus.Status.IN_FROZEN, PollStatus.Status.IN_PROGRESS]
+    for poll, question, status in zip(polls, questions, statuses):
+        PollStatus.objects.create(employee=employee, poll=poll, status=status, date_planned_at=today)
+        UserAnswer.objects.create(employee=employee, question=question, answer="Ответ")
+
+    # Act
+    metrics = reset_frozen_poll_statuses(chunk_size=1)
+
+    # Assert
+    assert (metrics["reset"], metrics["answers_deleted"]) == (2, 2)
+    assert list(UserAnswer.objects.values_list("question_id", flat=True)) == [questions[2].id]
+    assert list(PollStatus.objects.order_by("poll_id").values_list("status", flat=True)) == [
+        PollStatus.Status.NOT_STARTED, PollStatus.Status.NOT_STARTED, PollStatus.Status.IN_PROGRESS
+    ]
@@ -0,0 +1,63 @@
+import pytest
+from datetime import date
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+
+from employees.models import CuratorEmployees, Employee
+from projects.models import Project, ProjectAssignment
+from questions.models import PollQuestion, PollStatus, PollType, UserType
+from questions.planning import plan_poll_statuses
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_plan_poll_statuses_plans_employee_and_curator_polls_once():
+    # Arrange
+    day = date(2024, 3, 4)
+    project = Project.objects.create(name="Тестовый проект")
+    project_content_type = ContentType.objects.get_for_model(Project)
+    PollQuestion.objects.filter(content_type=project_content_type, object_id=project.id).delete()
+    employee_poll = PollQuestion.objects.create(
+        title="3-й день", message="Тест", days_after_hire=3,
+        content_type=project_content_type, object_id=project.id,
+    )
+    PollQuestion.objects.create(
+        title="4-й день", message="Тест", days_after_hire=4,
+        content_type=project_content_type, object_id=project.id,
+    )
+    curator_poll = PollQuestion.objects.create(
+        title="3-й день", message="Тест", days_after_hire=3, intended_for=UserType.CURATOR,
+        content_type=project_content_type, object_id=project.id,
+    )
+    feedback_poll = PollQuestion.objects.create(
+        title="Обратная связь", message="Тест", days_after_hire=3, poll_type=PollType.FEEDBACK,
+    )
+    employee, curator = Employee.objects.bulk_create([
+        Employee(
+            user=User.objects.create_user(email="planned@example.com", password="testpass"),
+            full_name="Test Employee", telegram_nickname="testemployee", date_of_employment=date(2024, 3, 1),
+        ),
+        Employee(
+            user=User.objects.create_user(email="curator@example.com", password="testpass"),
+            full_name="Test Curator", telegram_nickname="testcurator", role=Employee.RoleChoices.CURATOR,
+        ),
+    ])
+    ProjectAssignment.objects.bulk_create([
+        ProjectAssignment(employee=employee, project=project, date_of_employment=date(2024, 3, 1)),
+        ProjectAssignment(employee=curator, project=project),
+    ])
+    CuratorEmployees.objects.bulk_create([CuratorEmployees(curator=curator, employee=employee)])
+
+    # Act
+    result = plan_poll_statuses(day)
+    repeated = plan_poll_statuses(day)
+
+    # Assert
+    assert set(PollStatus.objects.values_list("employee_id", "poll_id", "target_employee_id")) == {
+        (employee.id, employee_poll.id, None),
+        (employee.id, feedback_poll.id, None),
+        (curator.id, curator_poll.id, employee.id),
+    }
+    assert (result.planned, result.skipped) == (3, 0)
+    assert (repeated.planned, repeated.skipped) == (0, 3)
@@ -0,0 +1,41 @@
+import pytest
+from datetime import date
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.management.bot.utils.functions import check_completion_previous_polls
+from core.management.bot.utils.poll_chain import get_poll_chain
+from employees.models import Employee
+from questions.models import PollQuestion, PollStatus
+
+
+@pytest.mark.django_db
+def test_check_completion_previous_polls_with_gap_in_numbering():
+    # Arrange
+    first = PollQuestion.objects.create(title="1", message="1", poll_number=1)
+    second = PollQuestion.objects.create(title="2", message="2", poll_number=2)
+    fourth = PollQuestion.objects.create(title="4", message="4", poll_number=4)
+    user = get_user_model().objects.create_user(email="chain@example.com", password="testpass")
+    employee = Employee.objects.create(
+        user=user,
+        full_name="Test Employee",
+        telegram_nickname="testemployee",
+        telegram_user_id=1002,
+        date_of_employment=date(2024, 1, 1),
+    )
+    for poll, status in (
+            (first, PollStatus.Status.COMPLETED),
+            (second, PollStatus.Status.NOT_STARTED),
+            (fourth, PollStatus.Status.NOT_STARTED),
+    ):
+        PollStatus.objects.create(employee=employee, poll=poll, status=status, date_planned_at=date(2024, 1, 1))
+    get_poll_chain()
+
+    # Act
+    with CaptureQueriesContext(connection) as context:
+        result = check_completion_previous_polls(employee.id, [first.id, second.id, fourth.id])
+
+    # Assert
+    assert len(context.captured_queries) == 1
+    assert result == {first.id: True, second.id: True, fourth.id: False}
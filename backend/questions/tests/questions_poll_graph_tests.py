@@ -0,0 +1,84 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.management.bot.utils.poll_graph import (
+    get_poll_graph,
+    get_compiled_next_question_id,
+    get_compiled_question,
+)
+from questions.models import PollQuestion, Question, QuestionCondition, QuestionType
+from questions.utils import create_questions, create_conditions
+
+
+@pytest.mark.django_db
+def test_poll_graph_transitions():
+    # Arrange
+    poll = PollQuestion.objects.create(title="Тест тайтл", message="Тест меседж")
+    questions = create_questions(
+        poll,
+        [
+            ("Все хорошо?", QuestionType.YES_NO),
+            ("Опиши подробнее", QuestionType.MESSAGE),
+            ("Спасибо", QuestionType.FINISH),
+        ],
+    )
+    create_conditions(
+        [
+            (questions[1], questions[0], "no"),
+            (questions[2], questions[0], "yes"),
+            (questions[2], questions[1], "some_text"),
+        ]
+    )
+
+    # Act
+    compiled_poll = get_poll_graph(poll.id)
+
+    # Assert
+    assert [question.id for question in compiled_poll.questions] == questions
+    assert compiled_poll.first_question.question_type == QuestionType.YES_NO
+    assert compiled_poll.get_next_question_id(questions[0], "no") == questions[1]
+    assert compiled_poll.get_next_question_id(questions[0], "yes") == questions[2]
+    assert compiled_poll.get_next_question_id(questions[1]) == questions[2]
+    assert compiled_poll.get_next_question_id(questions[2]) is None
+
+
+@pytest.mark.django_db
+def test_poll_graph_lookup_without_queries_and_invalidation():
+    # Arrange
+    poll = PollQuestion.objects.create(title="Тест тайтл", message="Тест меседж")
+    first = Question.objects.create(poll=poll, text="Вопрос", question_type=QuestionType.YES_NO)
+    finish = Question.objects.create(poll=poll, text="Конец", question_type=QuestionType.FINISH)
+    QuestionCondition.objects.create(question=finish, previous_question=first, answer_condition="yes")
+    get_poll_graph(poll.id)
+
+    # Act
+    with CaptureQueriesContext(connection) as context:
+        next_question_id = get_compiled_next_question_id(first.id, "yes")
+        next_question = get_compiled_question(next_question_id)
+
+    first.text = "Новый текст"
+    first.save()
+
+    # Assert
+    assert len(context.captured_queries) == 0
+    assert next_question.text == "Конец"
+    assert get_compiled_question(first.id).text == "Новый текст"
+
+
+@pytest.mark.django_db
+def test_compiled_question_missing_from_stale_graph_recompiles_once():
+    # Arrange
+    poll = PollQuestion.objects.create(title="Тест тайтл", message="Тест меседж")
+    Question.objects.create(poll=poll, text="Вопрос", question_type=QuestionType.YES_NO)
+    get_poll_graph(poll.id)
+    # bulk_create не вызывает сигналов: граф в памяти остается без нового вопроса
+    added, = Question.objects.bulk_create(
+        [Question(poll=poll, text="Новый вопрос", question_type=QuestionType.MESSAGE)]
+    )
+
+    # Act
+    question = get_compiled_question(added.id)
+
+    # Assert
+    assert question.text == "Новый вопрос"
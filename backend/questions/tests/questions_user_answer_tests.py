@@ -0,0 +1,37 @@
+import pytest
+from django.contrib.auth import get_user_model
+from datetime import date
+
+from core.management.bot.utils.functions import save_user_answer
+from core.management.bot.utils.identity import resolve_employee_identity
+from employees.models import Employee
+from questions.models import PollQuestion, Question, QuestionType, UserAnswer
+
+
+@pytest.mark.django_db
+def test_save_user_answer_upserts_answer_and_escalates_risk_status():
+    # Arrange
+    poll = PollQuestion.objects.create(title="Тест тайтл", message="Тест меседж")
+    question = Question.objects.create(
+        poll=poll, text="Все хорошо?", question_type=QuestionType.YES_NO
+    )
+    user = get_user_model().objects.create_user(email="testuser@example.com", password="testpass")
+    employee = Employee.objects.create(
+        user=user,
+        full_name="Test Employee",
+        telegram_nickname="testemployee",
+        telegram_user_id=1001,
+        date_of_employment=date(2024, 1, 1),
+    )
+    identity = resolve_employee_identity(employee.telegram_user_id)
+
+    # Act
+    save_user_answer(identity, question.id, "Да", 0)
+    save_user_answer(identity, question.id, "Нет", 0)
+
+    # Assert
+    user_answer = UserAnswer.objects.get(employee=employee, question=question)
+    employee.refresh_from_db()
+    assert user_answer.answer == "Нет"
+    assert user_answer.requires_attention
+    assert employee.risk_status == Employee.RiskStatus.OBSERVABLE
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 
 from aiogram.types import InlineKeyboardMarkup, ReplyKeyboardRemove
 from django.contrib.contenttypes.models import ContentType
@@ -126,17 +126,23 @@ def generate_message_count_polls(count_polls: int, poll_type: PollType, label_ti
     return f'У вас есть {poll} {poll_type_to_str[poll_type]} {label_time_of_day}'
 
 
-def add_label_content_type_poll(poll, message):
-    """Формирует приписку к опросу для указания источника опроса"""
+def add_label_content_type_poll(poll, message, project_names: Dict[int, str] | None = None):
+    """
+    Формирует приписку к опросу для указания источника опроса.
+    Названия проектов берутся из project_names, если они загружены заранее для пачки опросов
+    """
 
-    if poll.content_type is None:
+    if poll.content_type_id is None:
         if poll.poll_type == PollType.FEEDBACK:
             message = message + f"\n\n(Обратная связь)"
         elif poll.poll_type == PollType.INTERMEDIATE_FEEDBACK:
             message = message + f"\n\n(Промежуточная обратная связь)"
         elif poll.poll_type == PollType.OFFBOARDING:
             message = message + f"\n\n(Оффбординг)"
-    elif poll.content_type == ContentType.objects.get_for_model(Project):
-        project = Project.objects.get(id=poll.object_id)
-        message = message + f"\n\n(Проект: {project.name})"
+    elif poll.content_type_id == ContentType.objects.get_for_model(Project).id:
+        if project_names is not None and poll.object_id in project_names:
+            project_name = project_names[poll.object_id]
+        else:
+            project_name = Project.objects.get(id=poll.object_id).name
+        message = message + f"\n\n(Проект: {project_name})"
     return message
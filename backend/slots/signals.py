@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from slots.models import Slot
+from slots.utils import invalidate_free_slots
+
+
+@receiver([post_save, post_delete], sender=Slot)
+def invalidate_free_slots_cache(sender, instance: Slot, **kwargs):
+    """
+    Сбрасывает закэшированные свободные слоты на день слота при его создании, изменении или удалении
+    """
+    invalidate_free_slots(instance.date)
@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+
+from employees.models import Employee
+from slots.models import Slot
+from slots.utils import book_slot, get_free_slots
+
+BOOKERS_COUNT = 50
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_slot_booking_has_single_winner():
+    # Arrange
+    today = timezone.now().date()
+    slot = Slot.objects.create(start_time="15:00", date=today)
+    users = [
+        get_user_model().objects.create_user(email=f"booker{number}@example.com", password="testpass")
+        for number in range(BOOKERS_COUNT)
+    ]
+    employees = Employee.objects.bulk_create(
+        [Employee(user=user, full_name=f"Booker {number}") for number, user in enumerate(users)]
+    )
+    assert (slot.id, "15:00") in get_free_slots(today)
+    barrier = threading.Barrier(BOOKERS_COUNT)
+
+    def book(employee):
+        barrier.wait()
+        try:
+            return employee.id, book_slot(employee.id, slot.id)
+        finally:
+            connection.close()
+
+    # Act
+    with ThreadPoolExecutor(max_workers=BOOKERS_COUNT) as executor:
+        results = list(executor.map(book, employees))
+
+    # Assert
+    winners = [employee_id for employee_id, is_booked in results if is_booked]
+    slot.refresh_from_db()
+    assert len(winners) == 1
+    assert slot.booked_by_id == winners[0]
+    assert get_free_slots(today) == []
+
+
+@pytest.mark.django_db
+def test_failed_booking_drops_stale_free_slots():
+    # Arrange
+    today = timezone.now().date()
+    slot = Slot.objects.create(start_time="16:00", date=today)
+    users = [
+        get_user_model().objects.create_user(email=f"stale{number}@example.com", password="testpass")
+        for number in range(2)
+    ]
+    first, second = Employee.objects.bulk_create(
+        [Employee(user=user, full_name=f"Booker {number}") for number, user in enumerate(users)]
+    )
+    get_free_slots(today)
+    # бронь в обход сигналов: в кэше остается уже занятый слот
+    Slot.objects.filter(id=slot.id).update(booked_by=first)
+
+    # Act
+    is_booked = book_slot(second.id, slot.id)
+
+    # Assert
+    assert is_booked is False
+    assert (slot.id, "16:00") not in get_free_slots(today)
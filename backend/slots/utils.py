@@ -0,0 +1,48 @@
+from datetime import date
+from typing import List, Tuple
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from slots.models import Slot
+
+FREE_SLOTS_KEY = "FREE_SLOTS_{}"
+# Короткое время жизни ограничивает срок, на который гонка чтения с инвалидацией может закэшировать устаревший список
+FREE_SLOTS_TIMEOUT = 60 * 5
+
+
+def get_free_slots(day: date | None = None) -> List[Tuple[int, str]]:
+    """
+    Возвращает свободные слоты на день в виде (id, время начала) из Redis, при промахе - из БД
+    """
+    day = day or timezone.now().date()
+    key = FREE_SLOTS_KEY.format(day.isoformat())
+    free_slots = cache.get(key)
+    if free_slots is None:
+        free_slots = list(
+            Slot.objects.filter(date=day, booked_by__isnull=True)
+            .order_by("start_time")
+            .values_list("id", "start_time")
+        )
+        cache.set(key, free_slots, timeout=FREE_SLOTS_TIMEOUT)
+    return free_slots
+
+
+def invalidate_free_slots(day: date | None = None):
+    """
+    Сбрасывает закэшированные свободные слоты на день
+    """
+    day = day or timezone.now().date()
+    cache.delete(FREE_SLOTS_KEY.format(day.isoformat()))
+
+
+def book_slot(employee_id: int, slot_id: int) -> bool:
+    """
+    Бронирует слот одним условным UPDATE ... WHERE booked_by IS NULL.
+    При одновременных нажатиях слот достается только первому, остальные получают False.
+    Кэш свободных слотов сбрасывается в обоих случаях: неудачная бронь означает, что в кэше занятый слот
+    """
+    is_booked = Slot.objects.filter(id=slot_id, booked_by__isnull=True).update(booked_by_id=employee_id) > 0
+    # слоты предлагаются только на сегодня
+    invalidate_free_slots()
+    return is_booked